@@ -0,0 +1,216 @@
+from datetime import timedelta
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.paginator import Paginator, EmptyPage
+from django.db.models import Count
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, condition
+
+from .menu_version import get_menu_version, menu_etag, user_menu_etag, menu_last_modified
+from .models import DayMenu, DayMenuItem, UserSelection, SelectionItem
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# Готовые ответы с меню живут, пока не сменится версия меню
+API_CACHE_TIMEOUT = 3600
+
+
+def api_response(data, status=200):
+    """Компактный JSON: без лишних пробелов и без экранирования кириллицы"""
+    return JsonResponse(
+        data, status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+def api_view(etag_func, admin=False):
+    """
+    Общие декораторы API: только GET, JSON-ошибки 401/403 вместо редиректа
+    на страницу входа, сжатие gzip и условные запросы по версии меню.
+    """
+    def decorator(view_func):
+        conditional_view = require_GET(gzip_page(cache_control(private=True, no_cache=True)(
+            condition(etag_func=etag_func, last_modified_func=menu_last_modified)(view_func)
+        )))
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            user = request.user
+            if not user.is_authenticated:
+                return api_response({'error': 'Требуется авторизация'}, status=401)
+            if admin and not (user.is_admin or user.is_superuser or user.is_staff):
+                return api_response({'error': 'Недостаточно прав'}, status=403)
+            return conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _week_start(which):
+    today = timezone.now().date()
+    current_week_start = today - timedelta(days=today.weekday())
+    if which == 'next':
+        return current_week_start + timedelta(days=7)
+    return current_week_start
+
+
+def _date_range(request):
+    """Период из параметров date_from/date_to, по умолчанию - следующая неделя"""
+    next_week_start = _week_start('next')
+    date_from = request.GET.get('date_from')
+    date_to = request.GET.get('date_to')
+    try:
+        date_from = parse_date(date_from) if date_from else next_week_start
+        date_to = parse_date(date_to) if date_to else next_week_start + timedelta(days=4)
+    except ValueError:
+        date_from = date_to = None
+    if not date_from or not date_to:
+        raise ValueError('Даты должны быть в формате ГГГГ-ММ-ДД')
+    return date_from, date_to
+
+
+def _paginate(request, queryset):
+    try:
+        page_size = min(int(request.GET.get('page_size', API_PAGE_SIZE)), API_MAX_PAGE_SIZE)
+        page_number = int(request.GET.get('page', 1))
+    except ValueError:
+        raise ValueError('page и page_size должны быть числами')
+    paginator = Paginator(queryset, max(page_size, 1))
+    try:
+        page = paginator.page(page_number)
+    except EmptyPage:
+        raise ValueError('Нет такой страницы')
+    return {
+        'count': paginator.count,
+        'page': page.number,
+        'pages': paginator.num_pages,
+        'results': list(page.object_list),
+    }
+
+
+def _menus_payload(menus):
+    """Меню с блюдами по категориям: один запрос на меню и один на блюда"""
+    menus = list(menus.values('id', 'date', 'site'))
+    by_id = {}
+    for menu in menus:
+        menu['categories'] = {}
+        by_id[menu['id']] = menu
+
+    items = DayMenuItem.objects.filter(day_menu_id__in=by_id).order_by('day_menu_id', 'position').values(
+        'day_menu_id', 'category__name', 'meal_id', 'meal__name', 'meal__description', 'meal__is_complete_dish'
+    )
+    for item in items:
+        by_id[item['day_menu_id']]['categories'].setdefault(item['category__name'], []).append({
+            'id': item['meal_id'],
+            'name': item['meal__name'],
+            'description': item['meal__description'],
+            'complete': item['meal__is_complete_dish'],
+        })
+    return menus
+
+
+def _cached_menus_payload(key, menus):
+    """Ответы с меню одинаковы для всех пользователей - кэшируем по версии меню"""
+    cache_key = f"api:{key}:{get_menu_version()}"
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = _menus_payload(menus)
+        cache.set(cache_key, payload, API_CACHE_TIMEOUT)
+    return payload
+
+
+@api_view(menu_etag)
+def week_menu(request):
+    """Меню на текущую (week=current) или следующую (week=next, по умолчанию) неделю"""
+    which = request.GET.get('week', 'next')
+    if which not in ('current', 'next'):
+        return api_response({'error': 'week должен быть current или next'}, status=400)
+    week_start = _week_start(which)
+    menus = DayMenu.objects.filter(
+        date__range=[week_start, week_start + timedelta(days=4)]
+    ).order_by('date', 'site')
+    return api_response({
+        'week_start': week_start,
+        'menus': _cached_menus_payload(f"week:{week_start}", menus),
+    })
+
+
+@api_view(menu_etag)
+def day_menu(request, day_id):
+    menus = _cached_menus_payload(f"day:{day_id}", DayMenu.objects.filter(id=day_id))
+    if not menus:
+        return api_response({'error': 'Меню не найдено'}, status=404)
+    return api_response(menus[0])
+
+
+@api_view(user_menu_etag)
+def my_selections(request):
+    """Выбор текущего пользователя за период date_from..date_to, постранично"""
+    try:
+        date_from, date_to = _date_range(request)
+        selections = UserSelection.objects.filter(
+            user=request.user,
+            day_menu__date__range=[date_from, date_to]
+        ).order_by('day_menu__date', 'day_menu__site').values(
+            'day_menu_id', 'day_menu__date', 'day_menu__site', 'not_eating',
+            *[f'{field}_id' for field in UserSelection.SELECTION_FIELDS],
+            *[f'{field}__name' for field in UserSelection.SELECTION_FIELDS],
+        )
+        data = _paginate(request, selections)
+    except ValueError as e:
+        return api_response({'error': str(e)}, status=400)
+
+    data['results'] = [
+        {
+            'day_menu': row['day_menu_id'],
+            'date': row['day_menu__date'],
+            'site': row['day_menu__site'],
+            'not_eating': row['not_eating'],
+            'meals': {
+                category: {'id': row[f'{field}_id'], 'name': row[f'{field}__name']}
+                for field, category in UserSelection.SELECTION_FIELDS.items()
+                if row[f'{field}_id']
+            },
+        }
+        for row in data['results']
+    ]
+    return api_response(data)
+
+
+@api_view(menu_etag, admin=True)
+def kitchen_totals(request):
+    """Количество порций по блюдам за период, с фильтром по площадке, постранично"""
+    try:
+        date_from, date_to = _date_range(request)
+        totals = SelectionItem.objects.filter(
+            user_selection__day_menu__date__range=[date_from, date_to],
+            user_selection__not_eating=False
+        )
+        if 'site' in request.GET:
+            totals = totals.filter(user_selection__day_menu__site=request.GET['site'])
+        totals = totals.values(
+            'user_selection__day_menu__date', 'user_selection__day_menu__site',
+            'category__name', 'meal_id', 'meal__name'
+        ).annotate(count=Count('id')).order_by(
+            'user_selection__day_menu__date', 'user_selection__day_menu__site', 'category__name', 'meal__name'
+        )
+        data = _paginate(request, totals)
+    except ValueError as e:
+        return api_response({'error': str(e)}, status=400)
+
+    data['results'] = [
+        {
+            'date': row['user_selection__day_menu__date'],
+            'site': row['user_selection__day_menu__site'],
+            'category': row['category__name'],
+            'meal': {'id': row['meal_id'], 'name': row['meal__name']},
+            'count': row['count'],
+        }
+        for row in data['results']
+    ]
+    return api_response(data)
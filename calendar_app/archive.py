@@ -0,0 +1,144 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .classifier import dish_name_key
+from .models import (
+    ArchivedDay, ArchivedDishCount, ArchivedParticipation,
+    DayMenu, DayMenuItem, SelectionItem, UserSelection
+)
+
+logger = logging.getLogger(__name__)
+
+
+def week_start_of(date):
+    return date - timedelta(days=date.weekday())
+
+
+def week_menus(week_starts):
+    """Меню указанных недель: {id: {'id', 'date', 'site'}}."""
+    if not week_starts:
+        # Пустой Q() выбрал бы все меню
+        return {}
+    week_filter = Q()
+    for week_start in week_starts:
+        week_filter |= Q(date__range=[week_start, week_start + timedelta(days=4)])
+    return {
+        menu['id']: menu
+        for menu in DayMenu.objects.filter(week_filter).values('id', 'date', 'site')
+    }
+
+
+def collect_day_totals(menus):
+    """Итоги дней: {id меню: (пользователей с заказом, пользователей "не ем")}."""
+    return {
+        row['day_menu_id']: (row['ordered'], row['not_eating'])
+        for row in UserSelection.objects.filter(day_menu_id__in=menus).values('day_menu_id').annotate(
+            ordered=Count('id', filter=Q(not_eating=False, items__isnull=False), distinct=True),
+            not_eating=Count('id', filter=Q(not_eating=True), distinct=True),
+        )
+    }
+
+
+def collect_dish_counts(menus):
+    """
+    Порции по блюдам меню: список словарей day_menu_id, category, name,
+    is_complete_dish, portions. Блюда без заказов попадают с нулем.
+    """
+    portions = {
+        (row['user_selection__day_menu_id'], row['meal_id']): row['portions']
+        for row in SelectionItem.objects.filter(
+            user_selection__day_menu_id__in=menus, user_selection__not_eating=False
+        ).values('user_selection__day_menu_id', 'meal_id').annotate(portions=Count('id'))
+    }
+    return [
+        {
+            'day_menu_id': item['day_menu_id'],
+            'category': item['category__name'],
+            'name': item['meal__name'],
+            'is_complete_dish': item['meal__is_complete_dish'],
+            'portions': portions.get((item['day_menu_id'], item['meal_id']), 0),
+        }
+        for item in DayMenuItem.objects.filter(day_menu_id__in=menus).values(
+            'day_menu_id', 'meal_id', 'category__name', 'meal__name', 'meal__is_complete_dish'
+        )
+    ]
+
+
+def collect_participation(menus):
+    """Участие пользователей по неделям: {(user_id, username, начало недели): итоги}."""
+    participation = defaultdict(lambda: {'days_ordered': 0, 'days_not_eating': 0, 'meals_ordered': 0})
+    for row in UserSelection.objects.filter(day_menu_id__in=menus).values(
+        'user_id', 'user__username', 'day_menu_id', 'not_eating'
+    ).annotate(meals=Count('items')):
+        week_start = week_start_of(menus[row['day_menu_id']]['date'])
+        totals = participation[(row['user_id'], row['user__username'], week_start)]
+        if row['not_eating']:
+            totals['days_not_eating'] += 1
+        elif row['meals']:
+            totals['days_ordered'] += 1
+            totals['meals_ordered'] += row['meals']
+    return participation
+
+
+@transaction.atomic
+def archive_weeks(week_starts):
+    """
+    Сворачивает меню и выборы указанных недель в архивные итоги:
+    по строке на день и площадку, по строке на блюдо дня и по строке
+    на пользователя за неделю. Повторная архивация недели заменяет ее итоги.
+    Живые меню не удаляются - это делает вызывающий код.
+    Возвращает число заархивированных дней.
+    """
+    if not week_starts:
+        return 0
+    menus = week_menus(set(week_starts))
+    if not menus:
+        # Меню этих недель уже удалены - их архив остается как есть
+        return 0
+    week_starts = sorted({week_start_of(menu['date']) for menu in menus.values()})
+    ArchivedDay.objects.filter(week_start__in=week_starts).delete()
+    ArchivedParticipation.objects.filter(week_start__in=week_starts).delete()
+
+    day_totals = collect_day_totals(menus)
+    days = ArchivedDay.objects.bulk_create([
+        ArchivedDay(
+            date=menu['date'],
+            site=menu['site'],
+            week_start=week_start_of(menu['date']),
+            users_ordered=day_totals.get(menu_id, (0, 0))[0],
+            users_not_eating=day_totals.get(menu_id, (0, 0))[1],
+        )
+        for menu_id, menu in menus.items()
+    ])
+    days_by_menu = dict(zip(menus, days))
+
+    ArchivedDishCount.objects.bulk_create([
+        ArchivedDishCount(
+            day=days_by_menu[dish.pop('day_menu_id')],
+            name_key=dish_name_key(dish['name']),
+            **dish
+        )
+        for dish in collect_dish_counts(menus)
+    ], batch_size=1000)
+
+    ArchivedParticipation.objects.bulk_create([
+        ArchivedParticipation(user_id=user_id, username=username, week_start=week_start, **totals)
+        for (user_id, username, week_start), totals in collect_participation(menus).items()
+    ], batch_size=1000)
+
+    logger.info(f"Archived {len(days)} days for weeks {', '.join(map(str, week_starts))}")
+    return len(days)
+
+
+def archive_menus_before(date):
+    """Архивирует все недели, начавшиеся раньше date. Возвращает список этих недель."""
+    week_starts = sorted({
+        week_start_of(menu_date)
+        for menu_date in DayMenu.objects.filter(date__lt=date).values_list('date', flat=True).distinct()
+    })
+    archive_weeks(week_starts)
+    return week_starts
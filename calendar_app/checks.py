@@ -0,0 +1,26 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# INSERT ... ON CONFLICT DO UPDATE ... RETURNING, на котором держится сохранение выбора
+SQLITE_MIN_VERSION = (3, 35, 0)
+SUPPORTED_ENGINES = ('django.db.backends.sqlite3', 'django.db.backends.postgresql')
+
+
+@register(Tags.compatibility)
+def check_upsert_support(app_configs, **kwargs):
+    """Сохранение выбора (selections.upsert_selection) работает на SQLite 3.35+ и PostgreSQL."""
+    engine = settings.DATABASES['default']['ENGINE']
+    if engine not in SUPPORTED_ENGINES:
+        return [Error(
+            f'База {engine} не поддерживается: сохранение выбора требует SQLite 3.35+ или PostgreSQL',
+            id='calendar_app.E001',
+        )]
+    if engine == 'django.db.backends.sqlite3' and sqlite3.sqlite_version_info < SQLITE_MIN_VERSION:
+        return [Error(
+            f'SQLite {sqlite3.sqlite_version} слишком старая: сохранение выбора требует 3.35 или новее '
+            '(INSERT ... ON CONFLICT ... RETURNING)',
+            id='calendar_app.E002',
+        )]
+    return []
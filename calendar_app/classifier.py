@@ -0,0 +1,136 @@
+import logging
+import re
+from collections import defaultdict
+from datetime import timedelta
+
+from .models import CompleteDishName, Meal
+
+logger = logging.getLogger(__name__)
+
+# Категория, в которой блюда бывают полноценными
+COMPLETE_DISH_CATEGORY = 'Горячие блюда'
+
+# Слова из букв или из цифр; "Котлета,по-киевски" -> котлета, по, киевски
+TOKEN_RE = re.compile(r'[^\W\d_]+|\d+')
+
+# Предлоги и союзы не отличают одно блюдо от другого
+STOP_WORDS = {'с', 'со', 'и', 'в', 'во', 'на', 'по', 'из', 'под', 'для', 'без'}
+
+# Слова обрезаются до основы этой длины, чтобы падежи совпадали: котлета/котлетой, курицы/курицей
+STEM_LENGTH = 5
+
+# Минимальное сходство наборов слов (мера Жаккара) для подсказки администратору:
+# при двух общих словах допускает одно лишнее. Лишнее слово часто и есть гарнир,
+# поэтому нечеткое совпадение только подсказывает, а не проставляет флаг
+FUZZY_THRESHOLD = 0.6
+
+
+def dish_tokens(name):
+    """Нормализованный набор основ слов названия: нижний регистр, ё -> е, без предлогов."""
+    words = TOKEN_RE.findall((name or '').lower().replace('ё', 'е'))
+    return frozenset(word[:STEM_LENGTH] for word in words if word not in STOP_WORDS)
+
+
+def dish_name_key(name):
+    """Ключ названия: отсортированные слова, не зависит от порядка и пунктуации."""
+    return ' '.join(sorted(dish_tokens(name)))
+
+
+class DishIndex:
+    """
+    Индекс запомненных решений в памяти: точное совпадение ключа - словарь,
+    нечеткое - обратный индекс "слово -> ключи", по которому сравниваются
+    только названия с общими словами.
+    """
+
+    def __init__(self, entries):
+        self.flags = {}
+        self.names = {}
+        self.tokens = {}
+        self.by_token = defaultdict(set)
+        for key, name, is_complete in entries:
+            self.flags[key] = is_complete
+            self.names[key] = name
+            self.tokens[key] = frozenset(key.split())
+            for token in self.tokens[key]:
+                self.by_token[token].add(key)
+
+    def classify(self, name):
+        """Флаг полноценности для названия с тем же набором слов или None."""
+        return self.flags.get(dish_name_key(name))
+
+    def suggest(self, name):
+        """
+        Самое похожее запомненное решение для названия без точного совпадения:
+        (название, флаг) или None. Применяет его только администратор.
+        """
+        tokens = dish_tokens(name)
+        if ' '.join(sorted(tokens)) in self.flags:
+            return None
+
+        candidates = set().union(*(self.by_token.get(token, ()) for token in tokens))
+        best_key, best_score = None, FUZZY_THRESHOLD
+        for candidate in candidates:
+            candidate_tokens = self.tokens[candidate]
+            score = len(tokens & candidate_tokens) / len(tokens | candidate_tokens)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        if best_key is None:
+            return None
+        return self.names[best_key], self.flags[best_key]
+
+
+def load_dish_index():
+    """Загружает все запомненные решения одним запросом."""
+    return DishIndex(CompleteDishName.objects.values_list('name_key', 'name', 'is_complete'))
+
+
+def remember_complete_flags(meals):
+    """
+    Запоминает решения администратора. meals - пары (название, is_complete).
+    Все названия записываются одним INSERT ... ON CONFLICT DO UPDATE.
+    """
+    entries = {}
+    for name, is_complete in meals:
+        key = dish_name_key(name)
+        if key:
+            entries[key] = CompleteDishName(name_key=key, name=name, is_complete=is_complete)
+    CompleteDishName.objects.bulk_create(
+        entries.values(),
+        update_conflicts=True,
+        unique_fields=['name_key'],
+        update_fields=['name', 'is_complete', 'updated_at']
+    )
+
+
+def classify_week_meals(week_start):
+    """
+    Проставляет is_complete_dish горячим блюдам недели по запомненным решениям
+    для тех же названий: одно чтение блюд, одно чтение индекса и по одному UPDATE
+    на каждое состояние. Похожие, но не совпавшие названия остаются без решения.
+    Возвращает (число отмеченных полноценными, число блюд без решения).
+    """
+    meals = Meal.objects.filter(
+        category__name=COMPLETE_DISH_CATEGORY,
+        menu_items__day_menu__date__range=[week_start, week_start + timedelta(days=4)]
+    ).distinct().values_list('id', 'name')
+
+    index = load_dish_index()
+    ids_by_state = {True: [], False: []}
+    unknown = 0
+    for meal_id, name in meals:
+        is_complete = index.classify(name)
+        if is_complete is None:
+            unknown += 1
+        else:
+            ids_by_state[is_complete].append(meal_id)
+
+    for is_complete, meal_ids in ids_by_state.items():
+        if meal_ids:
+            Meal.objects.filter(id__in=meal_ids).update(is_complete_dish=is_complete)
+
+    logger.info(
+        f"Classified hot dishes for {week_start}: {len(ids_by_state[True])} complete, "
+        f"{len(ids_by_state[False])} not complete, {unknown} unknown"
+    )
+    return len(ids_by_state[True]), unknown
@@ -0,0 +1,73 @@
+import logging
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .archive import week_start_of
+from .exports import build_export
+from .menu_version import bump_menu_version
+from .models import DayMenu
+
+logger = logging.getLogger(__name__)
+
+
+def selection_deadline(week_start):
+    """
+    Момент закрытия выбора на неделю week_start: день SELECTION_DEADLINE_WEEKDAY
+    предыдущей недели (0 - понедельник) в SELECTION_DEADLINE_TIME по местному времени.
+    """
+    hour, minute = map(int, settings.SELECTION_DEADLINE_TIME.split(':'))
+    day = week_start - timedelta(days=7) + timedelta(days=settings.SELECTION_DEADLINE_WEEKDAY)
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+def is_week_locked(week_start, now=None):
+    """Неделя закрыта для выбора: она уже началась или ее срок выбора прошел."""
+    now = now or timezone.now()
+    return week_start <= week_start_of(timezone.localdate(now)) or now >= selection_deadline(week_start)
+
+
+def is_day_locked(day_menu, now=None):
+    """Выбор на день закрыт задачей блокировки или по сроку, даже если задача еще не запускалась."""
+    return day_menu.locked_at is not None or is_week_locked(week_start_of(day_menu.date), now)
+
+
+def lock_week(week_start):
+    """
+    Закрывает выбор на неделю: отмечает ее меню временем блокировки,
+    сбрасывает кэши страниц и заранее формирует итоговую выгрузку для кухни.
+    Повторный вызов ничего не делает. Возвращает число закрытых меню.
+    """
+    locked = DayMenu.objects.filter(
+        date__range=[week_start, week_start + timedelta(days=4)], locked_at__isnull=True
+    ).update(locked_at=timezone.now())
+    if not locked:
+        return 0
+    bump_menu_version()
+    try:
+        path = build_export(week_start)
+        logger.info(f"Locked week {week_start}: {locked} menus, export saved to {path}")
+    except ValueError as e:
+        logger.warning(f"Locked week {week_start}: {locked} menus, export not created: {e}")
+    return locked
+
+
+def lock_due_weeks(now=None):
+    """Закрывает текущую и следующую неделю, если их срок выбора прошел. Возвращает {неделя: закрыто меню}."""
+    now = now or timezone.now()
+    current_week_start = week_start_of(timezone.localdate(now))
+    return {
+        week_start: lock_week(week_start)
+        for week_start in (current_week_start, current_week_start + timedelta(days=7))
+        if is_week_locked(week_start, now)
+    }
+
+
+def next_deadline(now=None):
+    """Ближайший еще не наступивший срок выбора."""
+    now = now or timezone.now()
+    week_start = week_start_of(timezone.localdate(now)) + timedelta(days=7)
+    while selection_deadline(week_start) <= now:
+        week_start += timedelta(days=7)
+    return selection_deadline(week_start)
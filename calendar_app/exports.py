@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max, Sum
+from openpyxl import load_workbook
+
+from .models import DayMenu, SelectionItem, UserSelection
+
+logger = logging.getLogger(__name__)
+
+# Готовые выгрузки для кухни лежат рядом с загруженными меню,
+# по каталогу на неделю и по файлу на версию данных недели
+EXPORTS_DIR = 'exports'
+EXPORT_FILENAME_TEMPLATE = 'menu_with_selections_{week:%Y%m%d}.xlsx'
+
+# Через сколько секунд после изменения выборов фоновая задача пересобирает выгрузку:
+# серия сохранений в час пик дает одну сборку, а не по сборке на каждое
+EXPORT_BUILD_DELAY = 30
+
+# Сколько секунд хранится выгрузка после появления более новой: запрос, успевший
+# получить путь к прежней версии, еще может ее открыть
+EXPORT_KEEP_SUPERSEDED = 600
+
+# Колонки дней недели в файле меню: (блюда, подсчет)
+DAY_COLUMNS = {
+    0: ('B', 'C'),  # Понедельник
+    1: ('D', 'E'),  # Вторник
+    2: ('F', 'G'),  # Среда
+    3: ('H', 'I'),  # Четверг
+    4: ('J', 'K'),  # Пятница
+}
+
+
+def export_filename(week_start):
+    return EXPORT_FILENAME_TEMPLATE.format(week=week_start)
+
+
+def week_exports_dir(week_start):
+    return os.path.join(settings.MEDIA_ROOT, EXPORTS_DIR, f"{week_start:%Y%m%d}")
+
+
+def export_path(week_start, version):
+    """Выгрузка недели для версии данных: новая версия - новый файл, старый не переписывается."""
+    return os.path.join(week_exports_dir(week_start), f"{version}.xlsx")
+
+
+def week_export_version(week_start):
+    """
+    Версия данных выгрузки недели: меню с их файлами и сводка выборов.
+    Сохранение выбора увеличивает его version, новый выбор меняет число и
+    наибольший id, так что версия меняется только вместе с данными этой недели.
+    """
+    date_range = [week_start, week_start + timedelta(days=4)]
+    menus = list(DayMenu.objects.filter(date__range=date_range).values_list('id', 'upload_id').order_by('id'))
+    selections = UserSelection.objects.filter(day_menu__date__range=date_range).aggregate(
+        count=Count('id'), versions=Sum('version'), last=Max('id')
+    )
+    state = repr((menus, selections['count'], selections['versions'], selections['last']))
+    return hashlib.sha256(state.encode()).hexdigest()[:16]
+
+
+def selection_workbook(week_start):
+    """
+    Исходный файл меню недели с количеством выборов в колонках подсчета.
+    Выборы считаются одним сгруппированным запросом на всю неделю.
+    Возвращает содержимое XLSX; ValueError, если меню или его файла нет.
+    """
+    menus = list(DayMenu.objects.filter(
+        date__range=[week_start, week_start + timedelta(days=4)]
+    ).select_related('upload').order_by('date', 'site'))
+    if not menus:
+        raise ValueError('Меню на следующую неделю не найдено')
+
+    # Берем файл, из которого импортировано меню этой недели
+    upload = next((menu.upload for menu in menus if menu.upload), None)
+    if not upload or not upload.file.storage.exists(upload.file.name):
+        raise ValueError('Файл меню не найден')
+    wb = load_workbook(upload.file.path)
+
+    week_counts = SelectionItem.objects.filter(
+        user_selection__day_menu__in=menus,
+        user_selection__not_eating=False,
+        meal__excel_row__isnull=False
+    ).values_list('user_selection__day_menu_id', 'meal__excel_row').annotate(count=Count('id')).order_by()
+    counts_by_menu = defaultdict(dict)
+    for day_menu_id, excel_row, count in week_counts:
+        counts_by_menu[day_menu_id][excel_row] = count
+
+    for day_menu in menus:
+        _, count_column = DAY_COLUMNS[day_menu.date.weekday()]
+        # Меню площадки записываем на одноименный лист, иначе на активный
+        ws = wb[day_menu.site] if day_menu.site in wb.sheetnames else wb.active
+        for row, count in counts_by_menu.get(day_menu.id, {}).items():
+            ws[f'{count_column}{row}'] = count
+
+    # Исходный файл не меняем: его имя - хэш содержимого
+    output = BytesIO()
+    wb.save(output)
+    logger.info(f"Built selections workbook for week {week_start}: {len(menus)} menus")
+    return output.getvalue()
+
+
+def remove_superseded_exports(week_start, now=None):
+    """
+    Удаляет выгрузки недели, замененные более новыми раньше чем
+    EXPORT_KEEP_SUPERSEDED секунд назад. Самая новая выгрузка не удаляется.
+    """
+    directory = week_exports_dir(week_start)
+    now = now or time.time()
+    try:
+        files = sorted(
+            (entry.stat().st_mtime, entry.path) for entry in os.scandir(directory)
+            if entry.name.endswith('.xlsx')
+        )
+    except FileNotFoundError:
+        return
+    # Время замены файла - время появления следующего по новизне
+    for (_, path), (superseded_at, _) in zip(files, files[1:]):
+        if now - superseded_at > EXPORT_KEEP_SUPERSEDED:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def remove_stale_week_exports():
+    """
+    Удаляет каталоги выгрузок недель, у которых больше нет рабочих меню -
+    после архивации или очистки календаря собрать их заново все равно нельзя.
+    Возвращает список удаленных недель.
+    """
+    root = os.path.join(settings.MEDIA_ROOT, EXPORTS_DIR)
+    try:
+        entries = [entry for entry in os.scandir(root) if entry.is_dir()]
+    except FileNotFoundError:
+        return []
+    live_weeks = {
+        date - timedelta(days=date.weekday())
+        for date in DayMenu.objects.values_list('date', flat=True).distinct()
+    }
+    removed = []
+    for entry in entries:
+        try:
+            week_start = datetime.strptime(entry.name, '%Y%m%d').date()
+        except ValueError:
+            continue
+        if week_start not in live_weeks:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed.append(week_start)
+    if removed:
+        logger.info(f"Removed exports of {len(removed)} weeks without menus")
+    return removed
+
+
+def build_export(week_start, version=None):
+    """
+    Путь к выгрузке недели для текущей версии ее данных; собирает ее, если файла еще нет.
+    Файл пишется через временный, чтобы не отдать недописанный. Прежние версии
+    удаляются не сразу, а при следующих сборках - см. remove_superseded_exports.
+    """
+    version = version or week_export_version(week_start)
+    path = export_path(week_start, version)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    content = selection_workbook(week_start)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(tmp_path, settings.FILE_UPLOAD_PERMISSIONS)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    remove_superseded_exports(week_start)
+    logger.info(f"Saved export for week {week_start}, version {version}")
+    return path
+
+
+_scheduled_weeks = set()
+_scheduled_lock = threading.Lock()
+
+
+def _build_scheduled(week_start):
+    with _scheduled_lock:
+        _scheduled_weeks.discard(week_start)
+    try:
+        build_export(week_start)
+    except ValueError as e:
+        logger.info(f"Export for week {week_start} not built: {e}")
+    except Exception:
+        logger.exception(f"Export for week {week_start} failed")
+    finally:
+        # Поток таймера больше не нужен: его соединение закрываем сразу,
+        # иначе при CONN_MAX_AGE > 0 оно так и останется открытым
+        connections.close_all()
+
+
+def schedule_export(week_start):
+    """
+    Откладывает сборку выгрузки недели на EXPORT_BUILD_DELAY секунд в фоновом
+    потоке процесса. Пока сборка ждет, повторные вызовы для той же недели ничего
+    не добавляют. Поток фоновый: он не задерживает остановку процесса, а
+    несобранная выгрузка будет собрана при первом запросе.
+    """
+    with _scheduled_lock:
+        if week_start in _scheduled_weeks:
+            return
+        _scheduled_weeks.add(week_start)
+    timer = threading.Timer(EXPORT_BUILD_DELAY, _build_scheduled, args=[week_start])
+    timer.daemon = True
+    timer.start()
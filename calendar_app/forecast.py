@@ -0,0 +1,124 @@
+import logging
+from datetime import timedelta
+
+import pandas as pd
+from django.db import transaction
+
+from .classifier import dish_name_key
+from .models import ArchivedDay, ArchivedDishCount, DayMenu, DayMenuItem, DishForecast
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних архивных недель учитывается в прогнозе
+FORECAST_HISTORY_WEEKS = 12
+
+
+def load_forecast_history(week_start):
+    """
+    Архив за FORECAST_HISTORY_WEEKS недель до week_start: дни (site, weekday, users_ordered)
+    и порции блюд (category, name_key, portions, users_ordered дня) - два запроса.
+    """
+    history_start = week_start - timedelta(weeks=FORECAST_HISTORY_WEEKS)
+    days = pd.DataFrame.from_records(
+        ArchivedDay.objects.filter(week_start__gte=history_start, week_start__lt=week_start).values_list(
+            'id', 'site', 'date', 'users_ordered'
+        ),
+        columns=['day_id', 'site', 'date', 'users_ordered']
+    )
+    dishes = pd.DataFrame.from_records(
+        ArchivedDishCount.objects.filter(
+            day__week_start__gte=history_start, day__week_start__lt=week_start, day__users_ordered__gt=0
+        ).values_list('day_id', 'day__users_ordered', 'category', 'name_key', 'portions'),
+        columns=['day_id', 'users_ordered', 'category', 'name_key', 'portions']
+    )
+    return days, dishes
+
+
+def expected_users(days, site, weekday):
+    """Ожидаемое число заказов: среднее по площадке и дню недели, затем по площадке, затем общее."""
+    if days.empty:
+        return 0.0
+    ordered = days[days['users_ordered'] > 0]
+    for subset in (
+        ordered[(ordered['site'] == site) & (ordered['weekday'] == weekday)],
+        ordered[ordered['site'] == site],
+        ordered,
+    ):
+        if not subset.empty:
+            return float(subset['users_ordered'].mean())
+    return 0.0
+
+
+def forecast_week(week_start):
+    """
+    Прогнозирует порции блюд меню недели по истории заказов тех же
+    (нормализованных) названий. Доля выбирающих блюдо - отношение порций
+    к числу заказавших в дни, когда блюдо было в меню; для новых блюд -
+    средняя доля блюда своей категории. Доли блюд одной категории дня
+    приводятся к исторической доле пользователей, берущих эту категорию.
+    Возвращает DataFrame прогноза (day_menu_id, meal_id, rate, basis, portions).
+    """
+    menu = pd.DataFrame.from_records(
+        DayMenuItem.objects.filter(
+            day_menu__date__range=[week_start, week_start + timedelta(days=4)]
+        ).values_list('day_menu_id', 'day_menu__date', 'day_menu__site', 'meal_id', 'meal__name', 'category__name'),
+        columns=['day_menu_id', 'date', 'site', 'meal_id', 'name', 'category']
+    )
+    columns = ['day_menu_id', 'meal_id', 'rate', 'basis', 'portions']
+    days, dishes = load_forecast_history(week_start)
+    if menu.empty or dishes.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Доля выбирающих каждое блюдо и всю категорию, отношением сумм по дням
+    dish_rates = dishes.groupby(['category', 'name_key']).agg(
+        portions=('portions', 'sum'), users=('users_ordered', 'sum')
+    )
+    dish_rates = (dish_rates['portions'] / dish_rates['users']).rename('dish_rate')
+
+    per_day = dishes.groupby(['day_id', 'category']).agg(
+        portions=('portions', 'sum'), users=('users_ordered', 'first'), offered=('portions', 'size')
+    )
+    category_stats = per_day.groupby('category').agg(
+        portions=('portions', 'sum'), users=('users', 'sum'), offered=('offered', 'mean')
+    )
+    category_stats['uptake'] = (category_stats['portions'] / category_stats['users']).clip(upper=1)
+    category_stats['fallback_rate'] = category_stats['uptake'] / category_stats['offered']
+
+    menu['name_key'] = menu['name'].map(dish_name_key)
+    menu = menu.join(dish_rates, on=['category', 'name_key'])
+    menu = menu.join(category_stats[['uptake', 'fallback_rate']], on='category')
+    menu['basis'] = menu['dish_rate'].notna().map({True: 'dish', False: 'category'})
+    menu['rate'] = menu['dish_rate'].fillna(menu['fallback_rate'])
+    menu = menu[menu['rate'].notna()]
+    if menu.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Пользователь берет не больше одного блюда категории: доли нормируются к доле категории
+    rate_sums = menu.groupby(['day_menu_id', 'category'])['rate'].transform('sum')
+    menu['rate'] = (menu['rate'] / rate_sums.where(rate_sums > 0) * menu['uptake']).fillna(0)
+
+    if not days.empty:
+        days['weekday'] = pd.to_datetime(days['date']).dt.weekday
+    headcount = {
+        (site, date): expected_users(days, site, date.weekday())
+        for site, date in menu[['site', 'date']].drop_duplicates().itertuples(index=False)
+    }
+    menu['users'] = [headcount[(site, date)] for site, date in zip(menu['site'], menu['date'])]
+    menu['portions'] = (menu['rate'] * menu['users']).round().astype(int)
+    menu['rate'] = menu['rate'].round(4)
+    return menu[columns].reset_index(drop=True)
+
+
+@transaction.atomic
+def update_forecasts(week_start):
+    """Пересчитывает и сохраняет прогноз недели, заменяя прежний. Возвращает число блюд."""
+    forecast = forecast_week(week_start)
+    DishForecast.objects.filter(
+        day_menu__in=DayMenu.objects.filter(date__range=[week_start, week_start + timedelta(days=4)])
+    ).delete()
+    DishForecast.objects.bulk_create([
+        DishForecast(day_menu_id=row.day_menu_id, meal_id=row.meal_id, rate=row.rate, basis=row.basis, portions=row.portions)
+        for row in forecast.itertuples(index=False)
+    ], batch_size=1000)
+    logger.info(f"Forecast for week {week_start}: {len(forecast)} dishes")
+    return len(forecast)
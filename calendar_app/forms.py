@@ -30,6 +30,9 @@ class MealUploadForm(forms.ModelForm):
             self.fields['is_complete_dish'].help_text = 'Только администратор может изменять этот параметр'
 
 class UserSelectionForm(forms.ModelForm):
+    # Версия выбора, которую видел пользователь: сохранение не перезапишет более новую
+    version = forms.IntegerField(widget=forms.HiddenInput, required=False, min_value=0)
+
     class Meta:
         model = UserSelection
         fields = ['selected_salad', 'selected_soup', 'selected_main', 'selected_side', 'selected_bakery', 'not_eating']
@@ -37,6 +40,7 @@ class UserSelectionForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         instance = kwargs.get('instance')
+        self.fields['version'].initial = instance.version if instance else 0
         if instance:
             day_menu = instance.day_menu
             self.fields['selected_salad'].queryset = day_menu.salads.all()
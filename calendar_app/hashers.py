@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 с числом итераций из настройки PASSWORD_HASHER_ITERATIONS.
+    Алгоритм тот же (pbkdf2_sha256), поэтому существующие хэши проверяются
+    как есть, а при входе пользователя хэш с другим числом итераций
+    прозрачно пересчитывается (must_update сравнивает итерации).
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASHER_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
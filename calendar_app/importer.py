@@ -0,0 +1,195 @@
+import hashlib
+import logging
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import DayMenu, DayMenuItem, FoodCategory, Meal, UploadedMenu
+from .parsers import DAY_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Загруженные меню хранятся под именем по SHA-256 содержимого
+MENU_FILE_TEMPLATE = 'menu_{digest}.xlsx'
+
+# Сколько последних загруженных файлов хранить, не считая используемых в меню
+UPLOAD_RETENTION = 8
+
+
+def menu_file_path(digest):
+    return os.path.join(settings.MEDIA_ROOT, MENU_FILE_TEMPLATE.format(digest=digest))
+
+
+def store_upload(uploaded_file):
+    """
+    Сохраняет загруженный файл в MEDIA_ROOT, за один проход по
+    uploaded_file.chunks() считая SHA-256 содержимого.
+    Файл получает имя по хэшу, так что одинаковые загрузки ложатся в один файл.
+    Если обработчик загрузки уже записал файл в MEDIA_ROOT и посчитал хэш
+    (MenuUploadHandler), файл только переименовывается, без повторного чтения.
+    Возвращает (путь к файлу, hex-хэш).
+    """
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    if getattr(uploaded_file, 'sha256', None) and hasattr(uploaded_file, 'temporary_file_path'):
+        file_path = menu_file_path(uploaded_file.sha256)
+        os.chmod(uploaded_file.temporary_file_path(), settings.FILE_UPLOAD_PERMISSIONS)
+        os.replace(uploaded_file.temporary_file_path(), file_path)
+        return file_path, uploaded_file.sha256
+
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(suffix='.upload', dir=settings.MEDIA_ROOT)
+    try:
+        with os.fdopen(fd, 'wb') as destination:
+            for chunk in uploaded_file.chunks():
+                digest.update(chunk)
+                destination.write(chunk)
+        os.chmod(tmp_path, settings.FILE_UPLOAD_PERMISSIONS)
+        file_path = menu_file_path(digest.hexdigest())
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return file_path, digest.hexdigest()
+
+
+def discard_upload(file_path, digest):
+    """
+    Удаляет сохраненный файл неудавшейся загрузки, если на него не ссылается
+    ни одна успешная: транзакция импорта откатилась, а файл на диске остался бы сиротой.
+    """
+    if UploadedMenu.objects.filter(sha256=digest).exists():
+        return
+    try:
+        os.remove(file_path)
+        logger.info(f"Удален файл неудавшейся загрузки: {file_path}")
+    except OSError as e:
+        logger.error(f"Ошибка при удалении файла {file_path}: {str(e)}")
+
+
+def get_last_import():
+    """Возвращает последний импортированный UploadedMenu или None."""
+    return UploadedMenu.objects.order_by('-imported_at').first()
+
+
+def is_duplicate_upload(digest, parser_type, next_week_start):
+    """
+    True, если этот же файл тем же парсером уже импортирован и меню
+    на следующую неделю построены из него - повторный импорт ничего не изменит.
+    """
+    last = get_last_import()
+    if not last or (last.sha256, last.parser_type) != (digest, parser_type):
+        return False
+    return last.menus.filter(
+        date__range=[next_week_start, next_week_start + timedelta(days=4)]
+    ).exists()
+
+
+def record_upload(file_path, digest, parser_type, week_start, user=None):
+    """
+    Регистрирует успешно импортированный файл и связывает с ним меню недели.
+    Повторный импорт уже известного файла обновляет существующую запись.
+    """
+    upload, _ = UploadedMenu.objects.update_or_create(
+        sha256=digest,
+        defaults={
+            'file': os.path.relpath(file_path, settings.MEDIA_ROOT),
+            'week_start': week_start,
+            'size': os.path.getsize(file_path),
+            'parser_type': parser_type,
+            'uploaded_by': user,
+            'imported_at': timezone.now(),
+        }
+    )
+    DayMenu.objects.filter(
+        date__range=[week_start, week_start + timedelta(days=4)]
+    ).update(upload=upload)
+    return upload
+
+
+def forget_last_import():
+    """
+    Отвязывает меню от загруженных файлов, например после удаления всех блюд:
+    такие меню больше не соответствуют файлу, и его повторная загрузка
+    должна пройти полный импорт.
+    """
+    DayMenu.objects.filter(upload__isnull=False).update(upload=None)
+
+
+def cleanup_old_uploads(keep=UPLOAD_RETENTION):
+    """
+    Удаляет старые загруженные файлы, оставляя keep самых новых
+    и все файлы, из которых построены существующие меню.
+    """
+    recent_ids = list(UploadedMenu.objects.values_list('id', flat=True)[:keep])
+    stale = UploadedMenu.objects.exclude(id__in=recent_ids).filter(menus__isnull=True)
+    for upload in stale:
+        file_name = upload.file.name
+        try:
+            upload.file.delete(save=False)
+            logger.info(f"Удален старый файл: {file_name}")
+        except Exception as e:
+            logger.error(f"Ошибка при удалении файла {file_name}: {str(e)}")
+    stale.delete()
+
+
+def import_menu_frame(records, next_week_start, site=''):
+    """
+    Записывает разобранное меню (результат parse_menu_frame) в базу пачками:
+    одно создание меню на неделю, одно на все блюда и одно на все связи
+    меню с блюдами, вместо отдельных запросов на каждую ячейку.
+    Возвращает список созданных DayMenu.
+    """
+    return import_menu_sites({site: records}, next_week_start)
+
+
+def import_menu_sites(records_by_site, next_week_start):
+    """
+    То же, что import_menu_frame, но сразу для нескольких площадок:
+    меню всех площадок записываются одной общей пачкой запросов.
+    records_by_site - словарь {площадка: DataFrame из parse_menu_frame}.
+    """
+    categories = {}
+    for category_name in DayMenu.CATEGORY_FIELDS.values():
+        categories[category_name], _ = FoodCategory.objects.get_or_create(name=category_name)
+
+    menu_keys = [(site, day_offset) for site in records_by_site for day_offset in DAY_COLUMNS]
+    menus = DayMenu.objects.bulk_create([
+        DayMenu(date=next_week_start + timedelta(days=day_offset), site=site)
+        for site, day_offset in menu_keys
+    ])
+    menus_by_key = dict(zip(menu_keys, menus))
+
+    rows = [
+        (site, record)
+        for site, records in records_by_site.items()
+        for record in records.itertuples(index=False)
+    ]
+    meals = Meal.objects.bulk_create([
+        Meal(
+            name=record.name,
+            description=record.description,
+            category=categories[record.category],
+            excel_row=record.row
+        )
+        for site, record in rows
+    ])
+
+    DayMenuItem.objects.bulk_create([
+        DayMenuItem(
+            day_menu=menus_by_key[(site, record.day)],
+            meal=meal,
+            category=meal.category,
+            position=record.row
+        )
+        for (site, record), meal in zip(rows, meals)
+    ])
+
+    logger.info(
+        f"Imported {len(meals)} meals into {len(menus)} menus "
+        f"for {len(records_by_site)} site(s) starting {next_week_start}"
+    )
+    return menus
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from calendar_app.archive import archive_menus_before, week_start_of
+from calendar_app.exports import remove_stale_week_exports
+from calendar_app.menu_version import bump_menu_version
+from calendar_app.models import DayMenu, Meal
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит меню и выборы прошедших недель в архивные итоги и удаляет их '
+        'из рабочих таблиц. Запускать по расписанию, например раз в неделю.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            help='Архивировать недели, начавшиеся раньше этой даты (ГГГГ-ММ-ДД). '
+                 'По умолчанию - все недели до текущей'
+        )
+        parser.add_argument('--keep', action='store_true', help='Только архивировать, не удалять меню')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            before = parse_date(options['before'])
+            if not before:
+                raise CommandError('Дата должна быть в формате ГГГГ-ММ-ДД')
+        else:
+            before = week_start_of(timezone.now().date())
+
+        week_starts = archive_menus_before(before)
+        if not week_starts:
+            self.stdout.write('Нет недель для архивации')
+            return
+
+        if not options['keep']:
+            week_filter = Q()
+            for week_start in week_starts:
+                week_filter |= Q(date__range=[week_start, week_start + timedelta(days=6)])
+            DayMenu.objects.filter(week_filter).delete()
+            # Блюда, которые больше не стоят ни в одном меню
+            Meal.objects.filter(menu_items__isnull=True).delete()
+            remove_stale_week_exports()
+            bump_menu_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Заархивировано недель: {len(week_starts)} ({week_starts[0]} - {week_starts[-1]})"
+        ))
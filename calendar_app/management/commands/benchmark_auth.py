@@ -0,0 +1,75 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from calendar_app.provisioning import init_django_worker
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+def _check_passwords(encoded, count):
+    """Проверяет пароль count раз, возвращает затраченное время. Выполняется в процессе пула."""
+    start = time.perf_counter()
+    for _ in range(count):
+        check_password(BENCHMARK_PASSWORD, encoded)
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет скорость проверки паролей текущим хэшером: '
+        'входов в секунду на ядро и на всех процессах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20, help='Проверок пароля на процесс')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Число процессов')
+        parser.add_argument('--users', type=int, help='Оценить время входа для стольких пользователей')
+        parser.add_argument('--username', help='Дополнительно замерить authenticate() для этого пользователя')
+        parser.add_argument('--password', help='Пароль пользователя для --username')
+
+    def handle(self, *args, **options):
+        rounds, workers = options['rounds'], options['workers']
+        if rounds < 1 or workers < 1:
+            raise CommandError('--rounds и --workers должны быть положительными')
+
+        hasher = get_hasher()
+        encoded = make_password(BENCHMARK_PASSWORD)
+        self.stdout.write(f"Профиль: {settings.PASSWORD_HASHER_PROFILE}, хэшер: {hasher.algorithm}")
+        self.stdout.write(f"Параметры: {hasher.safe_summary(encoded)}")
+
+        per_check = _check_passwords(encoded, rounds) / rounds
+        per_core = 1 / per_check
+        self.stdout.write(f"Одно ядро: {per_check * 1000:.1f} мс на вход, {per_core:.1f} входов/с")
+
+        if workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=init_django_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'radium_food.settings'),)
+            ) as executor:
+                start = time.perf_counter()
+                list(executor.map(_check_passwords, [encoded] * workers, [rounds] * workers))
+                elapsed = time.perf_counter() - start
+            total = workers * rounds / elapsed
+            self.stdout.write(f"{workers} процессов: {total:.1f} входов/с")
+        else:
+            total = per_core
+
+        if options['users']:
+            self.stdout.write(
+                f"Вход {options['users']} пользователей займет около {options['users'] / total:.1f} с"
+            )
+
+        if options['username']:
+            start = time.perf_counter()
+            user = authenticate(username=options['username'], password=options['password'] or '')
+            elapsed = time.perf_counter() - start
+            if user is None:
+                raise CommandError('authenticate() не прошел: неверное имя пользователя или пароль')
+            self.stdout.write(f"authenticate(): {elapsed * 1000:.1f} мс с учетом запроса к базе")
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from calendar_app.archive import week_start_of
+from calendar_app.forecast import update_forecasts
+from calendar_app.menu_version import bump_menu_version
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает прогноз порций на следующую неделю по истории заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--current', action='store_true', help='Прогноз на текущую неделю вместо следующей')
+
+    def handle(self, *args, **options):
+        week_start = week_start_of(timezone.now().date())
+        if not options['current']:
+            week_start += timedelta(days=7)
+        count = update_forecasts(week_start)
+        bump_menu_version()
+        self.stdout.write(self.style.SUCCESS(f"Прогноз на неделю с {week_start}: блюд {count}"))
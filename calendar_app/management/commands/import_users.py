@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from calendar_app.models import CustomUser
+from calendar_app.provisioning import read_user_file, provision_users
+
+
+class Command(BaseCommand):
+    help = 'Создает пользователей из CSV/XLSX с колонками username, password, is_admin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к CSV или XLSX файлу')
+        parser.add_argument('--created-by', help='Имя пользователя, от имени которого создаются записи')
+        parser.add_argument('--workers', type=int, help='Число процессов для хэширования паролей')
+
+    def handle(self, *args, **options):
+        created_by = None
+        if options['created_by']:
+            try:
+                created_by = CustomUser.objects.get(username=options['created_by'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"Пользователь {options['created_by']} не найден")
+
+        try:
+            rows = read_user_file(options['path'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Не удалось прочитать файл: {e}")
+
+        created, errors = provision_users(rows, created_by=created_by, max_workers=options['workers'])
+
+        for line, username, message in errors:
+            self.stderr.write(f"Строка {line} ({username or '-'}): {message}")
+        for username, password in created:
+            if password:
+                self.stdout.write(f"{username}\t{password}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано пользователей: {len(created)}, строк с ошибками: {len(errors)}"
+        ))
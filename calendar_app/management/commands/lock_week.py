@@ -0,0 +1,40 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from calendar_app.archive import week_start_of
+from calendar_app.deadline import lock_due_weeks, lock_week, next_deadline
+
+# Как часто цикл --loop просыпается, даже если до срока далеко: переживает перевод часов и смену настроек
+LOOP_MAX_SLEEP = 3600
+
+
+class Command(BaseCommand):
+    help = (
+        'Закрывает выбор на неделю, срок которой прошел, и заранее формирует выгрузку для кухни. '
+        'Запускать по расписанию сразу после срока или оставить работать с --loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--now', action='store_true', help='Закрыть следующую неделю сейчас, не дожидаясь срока')
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно, закрывая недели в срок')
+
+    def handle(self, *args, **options):
+        if options['now']:
+            week_start = week_start_of(timezone.localdate()) + timedelta(days=7)
+            self.report({week_start: lock_week(week_start)})
+            return
+
+        self.report(lock_due_weeks())
+        while options['loop']:
+            deadline = next_deadline()
+            self.stdout.write(f"Следующий срок выбора: {timezone.localtime(deadline):%Y-%m-%d %H:%M}")
+            time.sleep(min(max((deadline - timezone.now()).total_seconds(), 1), LOOP_MAX_SLEEP))
+            self.report(lock_due_weeks())
+
+    def report(self, locked):
+        for week_start, count in locked.items():
+            if count:
+                self.stdout.write(self.style.SUCCESS(f"Закрыт выбор на неделю с {week_start}: меню {count}"))
@@ -0,0 +1,97 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib import messages
+from django.utils import timezone
+
+# Файл с отметкой версии меню: общий для всех процессов сервера
+MENU_VERSION_FILE = '.menu_version'
+
+
+def _version_path():
+    return os.path.join(settings.MEDIA_ROOT, MENU_VERSION_FILE)
+
+
+def get_menu_version():
+    """
+    Текущая версия меню - время последнего изменения в наносекундах.
+    Меняется при загрузке меню, переносе недели, сохранении выбора
+    и изменении признака полноценного блюда. 0, если меню еще не менялось.
+    """
+    try:
+        with open(_version_path(), encoding='ascii') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_menu_version():
+    """Отмечает изменение меню или выбора, делая недействительными все кэши страниц."""
+    version = max(time.time_ns(), get_menu_version() + 1)
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    tmp_path = f"{_version_path()}.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='ascii') as f:
+        f.write(str(version))
+    os.replace(tmp_path, _version_path())
+    return version
+
+
+def _current_week_start():
+    today = timezone.localdate()
+    return today - timedelta(days=today.weekday())
+
+
+def _has_pending_messages(request):
+    return bool(len(messages.get_messages(request)))
+
+
+def _next_week_lock():
+    """
+    Срок выбора следующей недели и прошел ли он. Выбор закрывается по времени
+    и без смены версии меню, поэтому это учитывается в условных ответах отдельно.
+    """
+    # deadline зависит от этого модуля, поэтому импортируется при вызове
+    from .deadline import is_week_locked, selection_deadline
+    next_week_start = _current_week_start() + timedelta(days=7)
+    return selection_deadline(next_week_start), is_week_locked(next_week_start)
+
+
+def menu_last_modified(request, *args, **kwargs):
+    """
+    Last-Modified для страниц меню: время последнего изменения меню,
+    но не раньше начала текущей недели и прошедшего срока выбора -
+    с их наступлением меняются видимые недели и блокировка выбора.
+    Пока у пользователя есть непоказанные сообщения, страница должна быть
+    отрисована заново, поэтому Last-Modified, как и ETag, не выдается.
+    """
+    if _has_pending_messages(request):
+        return None
+    changed = [timezone.make_aware(datetime.combine(_current_week_start(), datetime.min.time()))]
+    deadline, locked = _next_week_lock()
+    if locked:
+        changed.append(deadline)
+    version = get_menu_version()
+    if version:
+        changed.append(datetime.fromtimestamp(version / 1e9, tz=dt_timezone.utc))
+    return max(changed)
+
+
+def user_menu_etag(request, *args, **kwargs):
+    """
+    ETag страниц меню пользователя: версия меню, пользователь, неделя,
+    закрыт ли выбор на следующую неделю и аргументы URL (например, day_id).
+    Пока у пользователя есть непоказанные сообщения, ETag не выдается.
+    """
+    if _has_pending_messages(request):
+        return None
+    _, locked = _next_week_lock()
+    parts = [get_menu_version(), request.user.pk, _current_week_start().strftime('%Y%m%d'), int(locked)]
+    parts.extend(kwargs.values())
+    return '-'.join(str(part) for part in parts)
+
+
+def menu_etag(request, *args, **kwargs):
+    """ETag общих для всех пользователей ответов, например выгрузки для кухни."""
+    return f"{get_menu_version()}-{_current_week_start().strftime('%Y%m%d')}"
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0005_alter_daymenu_options_alter_foodcategory_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='daymenu',
+            options={'ordering': ['date', 'site'], 'verbose_name': 'Меню на день', 'verbose_name_plural': 'Меню по дням'},
+        ),
+        migrations.AddField(
+            model_name='daymenu',
+            name='site',
+            field=models.CharField(blank=True, default='', help_text='Площадка (офис/столовая), для которой составлено меню', max_length=100),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0006_daymenu_site'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadedMenu',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(help_text='Файл меню, имя - SHA-256 содержимого', max_length=255, upload_to='')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('week_start', models.DateField(help_text='Понедельник недели, на которую импортировано меню')),
+                ('size', models.PositiveBigIntegerField()),
+                ('parser_type', models.CharField(choices=[('standard', 'Стандартный'), ('smart', 'Умный'), ('frame', 'Быстрый'), ('multisite', 'Площадки по листам')], max_length=20)),
+                ('imported_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Загруженное меню',
+                'verbose_name_plural': 'Загруженные меню',
+                'ordering': ['-imported_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='daymenu',
+            name='upload',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='menus', to='calendar_app.uploadedmenu'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SELECTION_FIELDS = ['selected_salad', 'selected_soup', 'selected_main', 'selected_side', 'selected_bakery']
+
+
+def backfill_selection_items(apps, schema_editor):
+    UserSelection = apps.get_model('calendar_app', 'UserSelection')
+    SelectionItem = apps.get_model('calendar_app', 'SelectionItem')
+    items = []
+    for selection in UserSelection.objects.select_related(*SELECTION_FIELDS):
+        for field in SELECTION_FIELDS:
+            meal = getattr(selection, field)
+            if meal:
+                items.append(SelectionItem(user_selection=selection, category_id=meal.category_id, meal=meal))
+    SelectionItem.objects.bulk_create(items, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0007_uploadedmenu'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SelectionItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='calendar_app.foodcategory')),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='selection_items', to='calendar_app.meal')),
+                ('user_selection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='calendar_app.userselection')),
+            ],
+            options={
+                'verbose_name': 'Выбранное блюдо',
+                'verbose_name_plural': 'Выбранные блюда',
+                'ordering': ['user_selection', 'category'],
+            },
+        ),
+        migrations.RunPython(backfill_selection_items, migrations.RunPython.noop),
+    ]
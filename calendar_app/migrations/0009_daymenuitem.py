@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+MENU_FIELDS = ['salads', 'soups', 'main_courses', 'sides', 'bakery']
+
+
+def copy_menu_meals_to_items(apps, schema_editor):
+    DayMenu = apps.get_model('calendar_app', 'DayMenu')
+    DayMenuItem = apps.get_model('calendar_app', 'DayMenuItem')
+    items = []
+    for field in MENU_FIELDS:
+        through = DayMenu._meta.get_field(field).remote_field.through
+        for link in through.objects.select_related('meal'):
+            items.append(DayMenuItem(
+                day_menu_id=link.daymenu_id,
+                meal_id=link.meal_id,
+                category_id=link.meal.category_id,
+                position=link.meal.excel_row or 0,
+            ))
+    DayMenuItem.objects.bulk_create(items, batch_size=500)
+
+
+def copy_items_to_menu_meals(apps, schema_editor):
+    DayMenu = apps.get_model('calendar_app', 'DayMenu')
+    DayMenuItem = apps.get_model('calendar_app', 'DayMenuItem')
+    field_by_category = dict(zip(
+        ['Салаты', 'Супы', 'Горячие блюда', 'Гарниры', 'Выпечка'], MENU_FIELDS
+    ))
+    links = {field: [] for field in MENU_FIELDS}
+    for item in DayMenuItem.objects.select_related('category'):
+        field = field_by_category.get(item.category.name)
+        if field:
+            through = DayMenu._meta.get_field(field).remote_field.through
+            links[field].append(through(daymenu_id=item.day_menu_id, meal_id=item.meal_id))
+    for field, field_links in links.items():
+        DayMenu._meta.get_field(field).remote_field.through.objects.bulk_create(field_links, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0008_selectionitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DayMenuItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0, help_text='Порядок блюда в меню (строка в Excel)')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='calendar_app.foodcategory')),
+                ('day_menu', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='calendar_app.daymenu')),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_items', to='calendar_app.meal')),
+            ],
+            options={
+                'verbose_name': 'Блюдо в меню',
+                'verbose_name_plural': 'Блюда в меню',
+                'ordering': ['day_menu', 'position'],
+            },
+        ),
+        migrations.RunPython(copy_menu_meals_to_items, copy_items_to_menu_meals),
+        migrations.RemoveField(
+            model_name='daymenu',
+            name='bakery',
+        ),
+        migrations.RemoveField(
+            model_name='daymenu',
+            name='main_courses',
+        ),
+        migrations.RemoveField(
+            model_name='daymenu',
+            name='salads',
+        ),
+        migrations.RemoveField(
+            model_name='daymenu',
+            name='sides',
+        ),
+        migrations.RemoveField(
+            model_name='daymenu',
+            name='soups',
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:16
+
+from django.db import migrations, models
+
+from calendar_app.classifier import COMPLETE_DISH_CATEGORY, dish_name_key
+
+
+def remember_flagged_meals(apps, schema_editor):
+    """Уже отмеченные полноценные блюда становятся первыми записями индекса."""
+    Meal = apps.get_model('calendar_app', 'Meal')
+    CompleteDishName = apps.get_model('calendar_app', 'CompleteDishName')
+    entries = {}
+    for name in Meal.objects.filter(
+        category__name=COMPLETE_DISH_CATEGORY, is_complete_dish=True
+    ).values_list('name', flat=True):
+        key = dish_name_key(name)
+        if key:
+            entries[key] = CompleteDishName(name_key=key, name=name, is_complete=True)
+    CompleteDishName.objects.bulk_create(entries.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0010_customuser_username_lower_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompleteDishName',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name_key', models.CharField(help_text='Нормализованный набор слов названия', max_length=255, unique=True)),
+                ('name', models.CharField(help_text='Название блюда, по которому принято решение', max_length=200)),
+                ('is_complete', models.BooleanField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Запомненное горячее блюдо',
+                'verbose_name_plural': 'Запомненные горячие блюда',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(remember_flagged_meals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0011_completedishname'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('site', models.CharField(blank=True, default='', max_length=100)),
+                ('week_start', models.DateField(db_index=True)),
+                ('users_ordered', models.PositiveIntegerField(default=0, help_text='Сколько пользователей выбрали блюда')),
+                ('users_not_eating', models.PositiveIntegerField(default=0, help_text='Сколько пользователей отметили, что не едят')),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Архив дня',
+                'verbose_name_plural': 'Архив дней',
+                'ordering': ['date', 'site'],
+                'unique_together': {('date', 'site')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedDishCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=100)),
+                ('name', models.CharField(max_length=200)),
+                ('name_key', models.CharField(db_index=True, help_text='Нормализованное название, см. classifier.dish_name_key', max_length=255)),
+                ('is_complete_dish', models.BooleanField(default=False)),
+                ('portions', models.PositiveIntegerField(default=0)),
+                ('day', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dishes', to='calendar_app.archivedday')),
+            ],
+            options={
+                'verbose_name': 'Архив порций',
+                'verbose_name_plural': 'Архив порций',
+                'ordering': ['day', 'category', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedParticipation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=150)),
+                ('week_start', models.DateField()),
+                ('days_ordered', models.PositiveSmallIntegerField(default=0)),
+                ('days_not_eating', models.PositiveSmallIntegerField(default=0)),
+                ('meals_ordered', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Архив участия',
+                'verbose_name_plural': 'Архив участия',
+                'ordering': ['week_start', 'username'],
+                'unique_together': {('username', 'week_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0012_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DishForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('portions', models.PositiveIntegerField()),
+                ('rate', models.FloatField(help_text='Ожидаемая доля заказавших пользователей, выбирающих блюдо')),
+                ('basis', models.CharField(choices=[('dish', 'По истории блюда'), ('category', 'По категории')], max_length=10)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('day_menu', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='calendar_app.daymenu')),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='calendar_app.meal')),
+            ],
+            options={
+                'verbose_name': 'Прогноз порций',
+                'verbose_name_plural': 'Прогнозы порций',
+                'unique_together': {('day_menu', 'meal')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0013_dishforecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='daymenu',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, help_text='Когда выбор на день был закрыт по сроку', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0014_daymenu_locked_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userselection',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Номер изменения выбора, для обнаружения одновременных правок'),
+        ),
+    ]
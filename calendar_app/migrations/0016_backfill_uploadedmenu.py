@@ -0,0 +1,52 @@
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations
+
+# Отметка о последнем импорте и имя файла меню до появления UploadedMenu
+LAST_IMPORT_FILE = 'last_import.sha256'
+MENU_FILE_TEMPLATE = 'menu_{digest}.xlsx'
+
+
+def index_last_import(apps, schema_editor):
+    """
+    Меню, импортированные до UploadedMenu, выгружались из файла последнего
+    импорта. Регистрируем этот файл и связываем с ним меню последней недели,
+    чтобы выгрузка для них работала и без повторной загрузки.
+    """
+    DayMenu = apps.get_model('calendar_app', 'DayMenu')
+    UploadedMenu = apps.get_model('calendar_app', 'UploadedMenu')
+    try:
+        with open(os.path.join(settings.MEDIA_ROOT, LAST_IMPORT_FILE), encoding='utf-8') as f:
+            digest, parser_type = f.read().split()
+    except (OSError, ValueError):
+        return
+    name = MENU_FILE_TEMPLATE.format(digest=digest)
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    last_menu = DayMenu.objects.order_by('-date').first()
+    if not last_menu or not os.path.exists(path):
+        return
+
+    week_start = last_menu.date - timedelta(days=last_menu.date.weekday())
+    upload, _ = UploadedMenu.objects.get_or_create(sha256=digest, defaults={
+        'file': name,
+        'week_start': week_start,
+        'size': os.path.getsize(path),
+        'parser_type': parser_type,
+        'imported_at': datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc),
+    })
+    DayMenu.objects.filter(
+        date__range=[week_start, week_start + timedelta(days=4)], upload__isnull=True
+    ).update(upload=upload)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0015_userselection_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_last_import, migrations.RunPython.noop),
+    ]
@@ -2,11 +2,18 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Lower
 
 class CustomUser(AbstractUser):
     is_admin = models.BooleanField(default=False)
     created_by = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Поиск по началу имени без учета регистра в управлении пользователями
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+        ]
+
 class FoodCategory(models.Model):
     name = models.CharField(max_length=100)
     
@@ -34,6 +41,30 @@ class Meal(models.Model):
         verbose_name_plural = 'Блюда'
         ordering = ['category', 'excel_row', 'name']
 
+class UploadedMenu(models.Model):
+    PARSER_CHOICES = [
+        ('standard', 'Стандартный'),
+        ('smart', 'Умный'),
+        ('frame', 'Быстрый'),
+        ('multisite', 'Площадки по листам'),
+    ]
+
+    file = models.FileField(max_length=255, help_text="Файл меню, имя - SHA-256 содержимого")
+    sha256 = models.CharField(max_length=64, unique=True)
+    week_start = models.DateField(help_text="Понедельник недели, на которую импортировано меню")
+    size = models.PositiveBigIntegerField()
+    parser_type = models.CharField(max_length=20, choices=PARSER_CHOICES)
+    uploaded_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True)
+    imported_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.file.name} ({self.week_start})"
+
+    class Meta:
+        verbose_name = 'Загруженное меню'
+        verbose_name_plural = 'Загруженные меню'
+        ordering = ['-imported_at']
+
 class DayMenu(models.Model):
     DAYS_OF_WEEK = [
         (0, 'Понедельник'),
@@ -44,16 +75,61 @@ class DayMenu(models.Model):
     ]
     
     date = models.DateField()
-    salads = models.ManyToManyField(Meal, related_name='day_menus_as_salad', blank=True, 
-                                  limit_choices_to={'category__name': 'Салаты'})
-    soups = models.ManyToManyField(Meal, related_name='day_menus_as_soup', blank=True,
-                                 limit_choices_to={'category__name': 'Супы'})
-    main_courses = models.ManyToManyField(Meal, related_name='day_menus_as_main', blank=True,
-                                       limit_choices_to={'category__name': 'Горячие блюда'})
-    sides = models.ManyToManyField(Meal, related_name='day_menus_as_side', blank=True,
-                                limit_choices_to={'category__name': 'Гарниры'})
-    bakery = models.ManyToManyField(Meal, related_name='day_menus_as_bakery', blank=True,
-                                 limit_choices_to={'category__name': 'Выпечка'})
+    site = models.CharField(max_length=100, blank=True, default='',
+                            help_text="Площадка (офис/столовая), для которой составлено меню")
+    upload = models.ForeignKey(UploadedMenu, on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='menus')
+    locked_at = models.DateTimeField(null=True, blank=True,
+                                     help_text="Когда выбор на день был закрыт по сроку")
+    
+    # Прежние поля меню -> категория блюд
+    CATEGORY_FIELDS = {
+        'salads': 'Салаты',
+        'soups': 'Супы',
+        'main_courses': 'Горячие блюда',
+        'sides': 'Гарниры',
+        'bakery': 'Выпечка',
+    }
+    
+    def meals_in(self, category_name):
+        """Блюда меню в категории в порядке позиций."""
+        return Meal.objects.filter(
+            menu_items__day_menu=self,
+            menu_items__category__name=category_name
+        ).order_by('menu_items__position')
+    
+    def meals_by_category(self):
+        """
+        Все блюда меню одним запросом: {название категории: [блюда по позициям]}.
+        Использует items, если они уже загружены через prefetch_related.
+        """
+        items = self.items.all()
+        if not getattr(self, '_prefetched_objects_cache', {}).get('items'):
+            items = items.select_related('meal', 'category')
+        grouped = {}
+        for item in items:
+            grouped.setdefault(item.category.name, []).append(item.meal)
+        return grouped
+    
+    @property
+    def salads(self):
+        return self.meals_in('Салаты')
+    
+    @property
+    def soups(self):
+        return self.meals_in('Супы')
+    
+    @property
+    def main_courses(self):
+        return self.meals_in('Горячие блюда')
+    
+    @property
+    def sides(self):
+        return self.meals_in('Гарниры')
+    
+    @property
+    def bakery(self):
+        return self.meals_in('Выпечка')
     
     def get_day(self):
         return self.date.weekday()
@@ -62,14 +138,40 @@ class DayMenu(models.Model):
         return dict(self.DAYS_OF_WEEK)[self.get_day()]
     
     def __str__(self):
+        if self.site:
+            return f"{self.get_day_display()} ({self.date}, {self.site})"
         return f"{self.get_day_display()} ({self.date})"
     
     class Meta:
         verbose_name = 'Меню на день'
         verbose_name_plural = 'Меню по дням'
-        ordering = ['date']
+        ordering = ['date', 'site']
+
+class DayMenuItem(models.Model):
+    """Блюдо в меню дня: одна таблица связей вместо отдельной на каждую категорию."""
+    day_menu = models.ForeignKey(DayMenu, on_delete=models.CASCADE, related_name='items')
+    meal = models.ForeignKey(Meal, on_delete=models.CASCADE, related_name='menu_items')
+    category = models.ForeignKey(FoodCategory, on_delete=models.CASCADE)
+    position = models.PositiveIntegerField(default=0, help_text="Порядок блюда в меню (строка в Excel)")
+    
+    def __str__(self):
+        return f"{self.day_menu} - {self.meal.name}"
+    
+    class Meta:
+        verbose_name = 'Блюдо в меню'
+        verbose_name_plural = 'Блюда в меню'
+        ordering = ['day_menu', 'position']
 
 class UserSelection(models.Model):
+    # Поле выбора -> категория блюд, которую оно хранит
+    SELECTION_FIELDS = {
+        'selected_salad': 'Салаты',
+        'selected_soup': 'Супы',
+        'selected_main': 'Горячие блюда',
+        'selected_side': 'Гарниры',
+        'selected_bakery': 'Выпечка',
+    }
+
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     day_menu = models.ForeignKey(DayMenu, on_delete=models.CASCADE)
     not_eating = models.BooleanField(default=False)
@@ -83,6 +185,8 @@ class UserSelection(models.Model):
                                     related_name='selected_as_side')
     selected_bakery = models.ForeignKey(Meal, on_delete=models.SET_NULL, null=True, blank=True,
                                       related_name='selected_as_bakery')
+    version = models.PositiveIntegerField(default=0,
+                                          help_text="Номер изменения выбора, для обнаружения одновременных правок")
     
     def clean(self):
         if self.not_eating:
@@ -95,7 +199,23 @@ class UserSelection(models.Model):
     
     def save(self, *args, **kwargs):
         self.clean()
+        self.version += 1
         super().save(*args, **kwargs)
+        self.sync_items()
+    
+    def sync_items(self):
+        """Переписывает строки SelectionItem по текущим полям selected_*."""
+        self.items.all().delete()
+        SelectionItem.objects.bulk_create([
+            SelectionItem(user_selection=self, category_id=meal.category_id, meal=meal)
+            for meal in (getattr(self, field) for field in self.SELECTION_FIELDS)
+            if meal
+        ])
+    
+    @property
+    def selected_meals(self):
+        """Выбранные блюда по названию категории, из нормализованной таблицы."""
+        return {item.category.name: item.meal for item in self.items.all()}
     
     class Meta:
         verbose_name = 'Выбор пользователя'
@@ -104,4 +224,111 @@ class UserSelection(models.Model):
         ordering = ['day_menu', 'user']
     
     def __str__(self):
-        return f"{self.user.username} - {self.day_menu}"
\ No newline at end of file
+        return f"{self.user.username} - {self.day_menu}"
+
+class SelectionItem(models.Model):
+    """Одно выбранное блюдо: нормализованная форма полей selected_* UserSelection."""
+    user_selection = models.ForeignKey(UserSelection, on_delete=models.CASCADE, related_name='items')
+    category = models.ForeignKey(FoodCategory, on_delete=models.CASCADE)
+    meal = models.ForeignKey(Meal, on_delete=models.CASCADE, related_name='selection_items')
+
+    def __str__(self):
+        return f"{self.user_selection} - {self.meal.name}"
+
+    class Meta:
+        verbose_name = 'Выбранное блюдо'
+        verbose_name_plural = 'Выбранные блюда'
+        ordering = ['user_selection', 'category']
+
+class CompleteDishName(models.Model):
+    """
+    Решение администратора о полноценности блюда, запомненное по названию.
+    Новые блюда при импорте получают флаг по совпадению с этими названиями.
+    """
+    name_key = models.CharField(max_length=255, unique=True, help_text="Нормализованный набор слов названия")
+    name = models.CharField(max_length=200, help_text="Название блюда, по которому принято решение")
+    is_complete = models.BooleanField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({'полноценное' if self.is_complete else 'не полноценное'})"
+
+    class Meta:
+        verbose_name = 'Запомненное горячее блюдо'
+        verbose_name_plural = 'Запомненные горячие блюда'
+        ordering = ['name']
+
+class ArchivedDay(models.Model):
+    """Итоги прошедшего дня по площадке: живые меню и выборы после архивации удаляются."""
+    date = models.DateField()
+    site = models.CharField(max_length=100, blank=True, default='')
+    week_start = models.DateField(db_index=True)
+    users_ordered = models.PositiveIntegerField(default=0, help_text="Сколько пользователей выбрали блюда")
+    users_not_eating = models.PositiveIntegerField(default=0, help_text="Сколько пользователей отметили, что не едят")
+    archived_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.date} {self.site}".strip()
+
+    class Meta:
+        verbose_name = 'Архив дня'
+        verbose_name_plural = 'Архив дней'
+        unique_together = ['date', 'site']
+        ordering = ['date', 'site']
+
+class ArchivedDishCount(models.Model):
+    """Сколько порций блюда заказали в архивном дне; предложенные, но не выбранные - с нулем."""
+    day = models.ForeignKey(ArchivedDay, on_delete=models.CASCADE, related_name='dishes')
+    category = models.CharField(max_length=100)
+    name = models.CharField(max_length=200)
+    name_key = models.CharField(max_length=255, db_index=True, help_text="Нормализованное название, см. classifier.dish_name_key")
+    is_complete_dish = models.BooleanField(default=False)
+    portions = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} - {self.name}: {self.portions}"
+
+    class Meta:
+        verbose_name = 'Архив порций'
+        verbose_name_plural = 'Архив порций'
+        ordering = ['day', 'category', 'name']
+
+class ArchivedParticipation(models.Model):
+    """Участие пользователя за неделю: одна строка вместо выборов по дням."""
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True)
+    username = models.CharField(max_length=150)
+    week_start = models.DateField()
+    days_ordered = models.PositiveSmallIntegerField(default=0)
+    days_not_eating = models.PositiveSmallIntegerField(default=0)
+    meals_ordered = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.username} ({self.week_start})"
+
+    class Meta:
+        verbose_name = 'Архив участия'
+        verbose_name_plural = 'Архив участия'
+        unique_together = ['username', 'week_start']
+        ordering = ['week_start', 'username']
+
+class DishForecast(models.Model):
+    """Прогноз порций блюда в меню дня, считается пакетно по истории заказов."""
+    BASIS_CHOICES = [
+        ('dish', 'По истории блюда'),
+        ('category', 'По категории'),
+    ]
+
+    day_menu = models.ForeignKey(DayMenu, on_delete=models.CASCADE, related_name='forecasts')
+    meal = models.ForeignKey(Meal, on_delete=models.CASCADE, related_name='forecasts')
+    portions = models.PositiveIntegerField()
+    rate = models.FloatField(help_text="Ожидаемая доля заказавших пользователей, выбирающих блюдо")
+    basis = models.CharField(max_length=10, choices=BASIS_CHOICES)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.day_menu} - {self.meal.name}: {self.portions}"
+
+    class Meta:
+        verbose_name = 'Прогноз порций'
+        verbose_name_plural = 'Прогнозы порций'
+        unique_together = ['day_menu', 'meal']
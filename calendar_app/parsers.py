@@ -0,0 +1,168 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils.cell import column_index_from_string
+
+# Описание блюда в скобках в конце строки: "Котлета (курица, масло)"
+MEAL_DESCRIPTION_RE = re.compile(r'\s*\(([^)]+)\)\s*$')
+
+# То же самое для векторного разбора: название и описание целиком
+MEAL_NAME_RE = r'^(?P<name>.*?)\s*\((?P<description>[^)]+)\)$'
+
+# Размер кэша разобранных ячеек: одни и те же блюда повторяются по дням и неделям
+MEAL_NAME_CACHE_SIZE = 4096
+
+
+def parse_meal_name(cell_value):
+    """
+    Парсит название блюда из строки.
+    Возвращает название блюда и описание отдельно.
+    """
+    if not cell_value or not isinstance(cell_value, str):
+        return None, None
+    return _parse_meal_name(cell_value)
+
+
+@lru_cache(maxsize=MEAL_NAME_CACHE_SIZE)
+def _parse_meal_name(cell_value):
+    # Нормализуем пробелы и переносы строк один раз: после этого
+    # и название, и описание уже не содержат множественных пробелов
+    cell_value = ' '.join(cell_value.split())
+
+    description_match = MEAL_DESCRIPTION_RE.search(cell_value)
+    if description_match:
+        description = description_match.group(1).strip()
+        name = cell_value[:description_match.start()]
+        return name, description
+
+    # Если нет описания в скобках, возвращаем очищенное название без описания
+    return cell_value, None
+
+
+def parse_meal_names(values):
+    """
+    Векторный вариант parse_meal_name для целой колонки ячеек.
+    Принимает pandas.Series или любую последовательность значений и
+    возвращает DataFrame с колонками name и description (None, если нет).
+    Пустые и нестроковые ячейки дают name=None.
+    """
+    column = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    is_text = column.map(lambda value: isinstance(value, str))
+    text = column.where(is_text).str.split().str.join(' ')
+
+    parts = text.str.extract(MEAL_NAME_RE)
+    name = parts['name'].fillna(text)
+    description = parts['description'].str.strip()
+
+    result = pd.DataFrame({'name': name, 'description': description}, index=column.index)
+    result.loc[result['name'].isna() | (result['name'] == ''), ['name', 'description']] = None
+    return result.astype(object).where(result.notna(), None)
+
+
+# Колонки с блюдами для каждого дня недели (Пн-Пт)
+DAY_COLUMNS = {
+    0: 'B',  # Понедельник
+    1: 'D',  # Вторник
+    2: 'F',  # Среда
+    3: 'H',  # Четверг
+    4: 'J'   # Пятница
+}
+
+# Подписи категорий в колонке A и соответствующие им категории блюд
+CATEGORY_MAPPINGS = {
+    'салаты': 'Салаты',
+    'супы': 'Супы',
+    'горячие блюда': 'Горячие блюда',
+    'горячее': 'Горячие блюда',
+    'гарниры': 'Гарниры',
+    'выпечка': 'Выпечка'
+}
+
+# Первая строка, с которой начинаются категории (1 - заголовок, 2 - дни недели)
+FIRST_MENU_ROW = 3
+
+MENU_FRAME_COLUMNS = ['day', 'row', 'category', 'raw_text', 'name', 'description']
+
+
+def read_menu_sheet(file_path, sheet_name=None):
+    """
+    Читает лист меню целиком в DataFrame без заголовков.
+    Индекс строки DataFrame + 1 соответствует номеру строки в Excel,
+    колонка 0 - колонке A. Без sheet_name читается активный лист.
+    """
+    with pd.ExcelFile(file_path, engine='openpyxl') as excel:
+        if sheet_name is None:
+            sheet_name = excel.book.active.title
+        return excel.parse(sheet_name=sheet_name, header=None, dtype=object)
+
+
+def parse_menu_frame(sheet):
+    """
+    Векторный парсер листа меню.
+    Категории назначаются протягиванием подписей из колонки A вниз,
+    колонки дней разворачиваются в длинную таблицу
+    (day, row, category, raw_text), после чего названия и описания
+    разбираются строковыми операциями pandas.
+    Возвращает DataFrame с колонками MENU_FRAME_COLUMNS, по одной строке на блюдо.
+    """
+    sheet = sheet.copy()
+    sheet.index = sheet.index + 1  # номера строк Excel
+
+    labels = sheet[0] if 0 in sheet.columns else pd.Series(index=sheet.index, dtype=object)
+    labels = labels.where(labels.map(lambda value: isinstance(value, str))).str.strip().str.lower()
+    category = pd.Series(None, index=sheet.index, dtype=object)
+    for label, category_name in reversed(list(CATEGORY_MAPPINGS.items())):
+        category = category.mask(labels.str.contains(label, regex=False, na=False), category_name)
+    category[category.index < FIRST_MENU_ROW] = None
+    category = category.ffill()
+
+    day_columns = {
+        day: column_index_from_string(column) - 1 for day, column in DAY_COLUMNS.items()
+    }
+    days = sheet.reindex(columns=list(day_columns.values()))
+    days.columns = list(day_columns.keys())
+    days['category'] = category
+    days = days[days['category'].notna()]
+
+    records = days.rename_axis('row').reset_index().melt(
+        id_vars=['row', 'category'], var_name='day', value_name='raw_text'
+    )
+    records = records[records['raw_text'].notna()]
+    # Нестроковые ячейки (числа, даты) разбираем как текст, как и построчный парсер
+    records['raw_text'] = records['raw_text'].map(str)
+
+    names = parse_meal_names(records['raw_text'])
+    records = records.join(names)
+    records = records[records['name'].notna()]
+
+    records = records.astype({'day': int, 'row': int})
+    return records.sort_values(['day', 'row'])[MENU_FRAME_COLUMNS].reset_index(drop=True)
+
+
+def parse_menu_sheet(file_path, sheet_name=None):
+    """Читает и разбирает один лист меню. Выполняется в отдельном процессе."""
+    return parse_menu_frame(read_menu_sheet(file_path, sheet_name))
+
+
+def parse_menu_workbook(file_path, max_workers=None):
+    """
+    Разбирает каждый лист книги как меню отдельной площадки.
+    Листы обрабатываются параллельно в пуле процессов, так что время
+    разбора книги близко ко времени самого большого листа.
+    Возвращает словарь {название листа: DataFrame из parse_menu_frame}.
+    """
+    wb = load_workbook(file_path, read_only=True)
+    sheet_names = wb.sheetnames
+    wb.close()
+
+    if len(sheet_names) == 1 or max_workers == 1:
+        return {name: parse_menu_sheet(file_path, name) for name in sheet_names}
+
+    workers = min(len(sheet_names), max_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {name: executor.submit(parse_menu_sheet, file_path, name) for name in sheet_names}
+        return {name: future.result() for name, future in futures.items()}
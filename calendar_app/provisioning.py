@@ -0,0 +1,131 @@
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import pandas as pd
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.utils.crypto import get_random_string
+
+from .models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+# Колонки файла со списком пользователей; обязательна только username
+USER_FILE_COLUMNS = ['username', 'password', 'is_admin']
+
+# Значения колонки is_admin, которые считаются "да"
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'да', '+'}
+
+# Меньше стольких паролей хэшируем в текущем процессе: запуск пула дороже
+PROCESS_POOL_THRESHOLD = 32
+
+GENERATED_PASSWORD_LENGTH = 12
+
+USER_BATCH_SIZE = 500
+
+
+def read_user_file(file):
+    """
+    Читает CSV или XLSX со списком пользователей в DataFrame.
+    Первая строка - заголовки (username, password, is_admin),
+    все значения читаются как строки, пустые ячейки - пустые строки.
+    """
+    name = getattr(file, 'name', str(file)).lower()
+    if name.endswith(('.xlsx', '.xls')):
+        frame = pd.read_excel(file, dtype=str)
+    else:
+        if hasattr(file, 'read'):
+            # Загруженный файл отдает байты; разделитель (, или ;) определяется по тексту
+            file = io.StringIO(file.read().decode('utf-8-sig'))
+        frame = pd.read_csv(file, dtype=str, sep=None, engine='python', encoding='utf-8-sig')
+
+    frame.columns = [str(column).strip().lower() for column in frame.columns]
+    if 'username' not in frame.columns:
+        raise ValueError('В файле нет колонки username')
+    frame = frame.reindex(columns=USER_FILE_COLUMNS).fillna('')
+    return frame.apply(lambda column: column.str.strip())
+
+
+def init_django_worker(settings_module):
+    """Инициализатор процессов пула: настраивает Django в дочернем процессе"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def hash_passwords(passwords, max_workers=None):
+    """
+    Хэширует пароли. Хэширование намеренно медленное, поэтому большие
+    списки раскладываются по пулу процессов - по процессу на ядро.
+    """
+    if len(passwords) < PROCESS_POOL_THRESHOLD or max_workers == 1:
+        return [make_password(password) for password in passwords]
+
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_django_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'radium_food.settings'),)
+    ) as executor:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+def provision_users(rows, created_by=None, max_workers=None):
+    """
+    Создает пользователей из DataFrame (результат read_user_file).
+    Строки с ошибками пропускаются, остальные создаются одним bulk_create.
+    Пустой пароль заменяется сгенерированным.
+
+    Возвращает (created, errors):
+    created - список (username, сгенерированный пароль или None),
+    errors - список (номер строки в файле, username, текст ошибки).
+    """
+    errors = []
+    username_field = CustomUser._meta.get_field('username')
+    existing = set(CustomUser.objects.filter(
+        username__in=rows['username'].tolist()
+    ).values_list('username', flat=True))
+    seen = set()
+    users, passwords, generated = [], [], []
+
+    for index, row in enumerate(rows.itertuples(index=False)):
+        line = index + 2  # первая строка файла - заголовки
+        username = row.username
+        if not username:
+            errors.append((line, username, 'Не указано имя пользователя'))
+            continue
+        if username in existing:
+            errors.append((line, username, 'Пользователь уже существует'))
+            continue
+        if username in seen:
+            errors.append((line, username, 'Имя повторяется в файле'))
+            continue
+
+        user = CustomUser(
+            username=username,
+            is_admin=row.is_admin.lower() in TRUE_VALUES,
+            created_by=created_by
+        )
+        password = row.password or get_random_string(GENERATED_PASSWORD_LENGTH)
+        try:
+            username_field.run_validators(username)
+            validate_password(password, user)
+        except ValidationError as e:
+            errors.append((line, username, ' '.join(e.messages)))
+            continue
+
+        seen.add(username)
+        users.append(user)
+        passwords.append(password)
+        generated.append(None if row.password else password)
+
+    for user, password_hash in zip(users, hash_passwords(passwords, max_workers)):
+        user.password = password_hash
+    CustomUser.objects.bulk_create(users, batch_size=USER_BATCH_SIZE)
+
+    logger.info(f"Provisioned {len(users)} users, {len(errors)} rows rejected")
+    return [(user.username, password) for user, password in zip(users, generated)], errors
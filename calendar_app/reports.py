@@ -0,0 +1,195 @@
+import logging
+from datetime import timedelta
+from io import BytesIO
+
+import pandas as pd
+from django.core.cache import cache
+
+from .archive import collect_day_totals, collect_dish_counts, collect_participation, week_menus, week_start_of
+from .classifier import dish_name_key
+from .menu_version import get_menu_version
+from .models import ArchivedDay, ArchivedDishCount, ArchivedParticipation
+
+logger = logging.getLogger(__name__)
+
+# Отчеты за период пересчитываются только после изменения меню или выборов
+REPORT_CACHE_TIMEOUT = 3600
+
+DAY_COLUMNS = ['date', 'site', 'users_ordered', 'users_not_eating']
+DISH_COLUMNS = ['date', 'site', 'category', 'name', 'name_key', 'portions']
+PARTICIPATION_COLUMNS = ['week_start', 'username', 'days_ordered', 'days_not_eating', 'meals_ordered']
+
+
+def load_history(date_from, date_to):
+    """
+    История за период в трех DataFrame: дни, порции блюд и участие по неделям.
+    Архив читается тремя запросами values_list; недели с рабочими меню
+    сворачиваются на лету теми же функциями, что и архив.
+    """
+    days = pd.DataFrame.from_records(
+        ArchivedDay.objects.filter(date__range=[date_from, date_to]).values_list(*DAY_COLUMNS),
+        columns=DAY_COLUMNS
+    )
+    dishes = pd.DataFrame.from_records(
+        ArchivedDishCount.objects.filter(day__date__range=[date_from, date_to]).values_list(
+            'day__date', 'day__site', 'category', 'name', 'name_key', 'portions'
+        ),
+        columns=DISH_COLUMNS
+    )
+    participation = pd.DataFrame.from_records(
+        ArchivedParticipation.objects.filter(
+            week_start__range=[week_start_of(date_from), date_to]
+        ).values_list(*PARTICIPATION_COLUMNS),
+        columns=PARTICIPATION_COLUMNS
+    )
+
+    # Неделя, у которой еще есть рабочие меню, берется из них, даже если она уже
+    # архивировалась: рабочие данные новее архивных
+    weeks = set()
+    week = week_start_of(date_from)
+    while week <= date_to:
+        weeks.add(week)
+        week += timedelta(days=7)
+    menus = {
+        menu_id: menu for menu_id, menu in week_menus(weeks).items()
+        if date_from <= menu['date'] <= date_to
+    }
+    live_weeks = {week_start_of(menu['date']) for menu in menus.values()}
+    if live_weeks:
+        days = days[~days['date'].map(week_start_of).isin(live_weeks)]
+        dishes = dishes[~dishes['date'].map(week_start_of).isin(live_weeks)]
+        participation = participation[~participation['week_start'].isin(live_weeks)]
+    if menus:
+        day_totals = collect_day_totals(menus)
+        live_days = pd.DataFrame.from_records([
+            (menu['date'], menu['site'], *day_totals.get(menu_id, (0, 0)))
+            for menu_id, menu in menus.items()
+        ], columns=DAY_COLUMNS)
+        live_dishes = pd.DataFrame.from_records([
+            (menus[dish['day_menu_id']]['date'], menus[dish['day_menu_id']]['site'],
+             dish['category'], dish['name'], dish_name_key(dish['name']), dish['portions'])
+            for dish in collect_dish_counts(menus)
+        ], columns=DISH_COLUMNS)
+        live_participation = pd.DataFrame.from_records([
+            (week_start, username, totals['days_ordered'], totals['days_not_eating'], totals['meals_ordered'])
+            for (_, username, week_start), totals in collect_participation(menus).items()
+        ], columns=PARTICIPATION_COLUMNS)
+        days = pd.concat([days, live_days], ignore_index=True)
+        dishes = pd.concat([dishes, live_dishes], ignore_index=True)
+        participation = pd.concat([participation, live_participation], ignore_index=True)
+
+    return days, dishes, participation
+
+
+def dish_popularity(dishes):
+    """Популярность блюд по нормализованному названию: сколько раз предлагалось и заказывалось."""
+    if dishes.empty:
+        return pd.DataFrame(columns=['category', 'name', 'offered', 'portions', 'per_day', 'share'])
+    popularity = dishes.groupby(['category', 'name_key'], sort=False).agg(
+        name=('name', 'first'),
+        offered=('portions', 'size'),
+        portions=('portions', 'sum'),
+    ).reset_index()
+    popularity['per_day'] = (popularity['portions'] / popularity['offered']).round(2)
+    category_totals = popularity.groupby('category')['portions'].transform('sum')
+    popularity['share'] = (popularity['portions'] / category_totals.where(category_totals > 0)).fillna(0).round(3)
+    return popularity.sort_values(['portions', 'per_day'], ascending=False)[
+        ['category', 'name', 'offered', 'portions', 'per_day', 'share']
+    ].reset_index(drop=True)
+
+
+def waste_by_week(days, dishes):
+    """
+    Оценка потерь по неделям: доля пользователей, отказавшихся от обеда,
+    и доля предложенных блюд, которые никто не заказал.
+    """
+    if days.empty:
+        return pd.DataFrame(columns=[
+            'week_start', 'users_ordered', 'users_not_eating', 'not_eating_rate', 'unordered_dishes', 'unordered_rate'
+        ])
+    days = days.assign(week_start=pd.to_datetime(days['date']).dt.to_period('W-SUN').dt.start_time.dt.date)
+    waste = days.groupby('week_start').agg(
+        users_ordered=('users_ordered', 'sum'),
+        users_not_eating=('users_not_eating', 'sum'),
+    )
+    answered = waste['users_ordered'] + waste['users_not_eating']
+    waste['not_eating_rate'] = (waste['users_not_eating'] / answered.where(answered > 0)).fillna(0).round(3)
+
+    dishes = dishes.assign(
+        week_start=pd.to_datetime(dishes['date']).dt.to_period('W-SUN').dt.start_time.dt.date,
+        unordered=dishes['portions'] == 0,
+    )
+    offers = dishes.groupby('week_start').agg(offered=('unordered', 'size'), unordered_dishes=('unordered', 'sum'))
+    waste = waste.join(offers, how='left').fillna({'offered': 0, 'unordered_dishes': 0})
+    waste['unordered_rate'] = (waste['unordered_dishes'] / waste['offered'].where(waste['offered'] > 0)).fillna(0).round(3)
+    return waste.drop(columns='offered').astype({'unordered_dishes': int}).reset_index()
+
+
+def participation_by_month(participation, days):
+    """Участие пользователей по месяцам: дни с заказом, дни отказа и доля дней с меню."""
+    columns = ['month', 'username', 'days_ordered', 'days_not_eating', 'meals_ordered', 'rate']
+    if participation.empty:
+        return pd.DataFrame(columns=columns)
+    participation = participation.assign(
+        month=pd.to_datetime(participation['week_start']).dt.to_period('M').astype(str)
+    )
+    monthly = participation.groupby(['month', 'username'], as_index=False)[
+        ['days_ordered', 'days_not_eating', 'meals_ordered']
+    ].sum()
+    menu_days = pd.to_datetime(days['date'].drop_duplicates()).dt.to_period('M').astype(str).value_counts()
+    monthly['rate'] = (monthly['days_ordered'] / monthly['month'].map(menu_days)).fillna(0).clip(upper=1).round(3)
+    return monthly.sort_values(['month', 'days_ordered'], ascending=[True, False])[columns].reset_index(drop=True)
+
+
+def participation_totals(monthly):
+    """Участие за весь период по пользователю - для страницы, помесячно оно есть в XLSX."""
+    columns = ['username', 'days_ordered', 'days_not_eating', 'meals_ordered']
+    if monthly.empty:
+        return pd.DataFrame(columns=columns)
+    totals = monthly.groupby('username', as_index=False)[columns[1:]].sum()
+    return totals.sort_values('days_ordered', ascending=False).reset_index(drop=True)
+
+
+def build_reports(date_from, date_to):
+    """
+    Все отчеты за период. Результат кэшируется по периоду и версии меню,
+    так что повторные открытия страницы не читают историю заново.
+    """
+    cache_key = f"reports:{date_from}:{date_to}:{get_menu_version()}"
+    reports = cache.get(cache_key)
+    if reports is None:
+        days, dishes, participation = load_history(date_from, date_to)
+        reports = {
+            'popularity': dish_popularity(dishes),
+            'waste': waste_by_week(days, dishes),
+            'participation': participation_by_month(participation, days),
+        }
+        cache.set(cache_key, reports, REPORT_CACHE_TIMEOUT)
+        logger.info(f"Built reports for {date_from} - {date_to}: {len(days)} days, {len(dishes)} dish rows")
+    return reports
+
+
+REPORT_SHEETS = {
+    'popularity': ('Популярность', {
+        'category': 'Категория', 'name': 'Блюдо', 'offered': 'Предлагалось раз',
+        'portions': 'Порций', 'per_day': 'Порций в день', 'share': 'Доля в категории',
+    }),
+    'waste': ('Отказы', {
+        'week_start': 'Неделя', 'users_ordered': 'Заказов', 'users_not_eating': 'Отказов',
+        'not_eating_rate': 'Доля отказов', 'unordered_dishes': 'Блюд без заказов',
+        'unordered_rate': 'Доля блюд без заказов',
+    }),
+    'participation': ('Участие', {
+        'month': 'Месяц', 'username': 'Пользователь', 'days_ordered': 'Дней с заказом',
+        'days_not_eating': 'Дней отказа', 'meals_ordered': 'Блюд заказано', 'rate': 'Доля дней с заказом',
+    }),
+}
+
+
+def reports_workbook(reports):
+    """XLSX со всеми отчетами, по листу на отчет."""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for key, (sheet_name, columns) in REPORT_SHEETS.items():
+            reports[key].rename(columns=columns).to_excel(writer, sheet_name=sheet_name, index=False)
+    return output.getvalue()
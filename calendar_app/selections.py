@@ -0,0 +1,56 @@
+from django.db import connection, transaction
+
+from .models import UserSelection
+
+# Поля выбора, которые переписывает сохранение формы
+UPSERT_FIELDS = ['not_eating', *UserSelection.SELECTION_FIELDS]
+
+
+def _column(name):
+    return connection.ops.quote_name(UserSelection._meta.get_field(name).column)
+
+
+def upsert_selection(selection, expected_version):
+    """
+    Сохраняет выбор пользователя на день одним INSERT ... ON CONFLICT DO UPDATE
+    с оптимистичной блокировкой: существующая строка обновляется, только если ее
+    версия равна expected_version - той, что была показана пользователю.
+    Вместо чтения и последующей записи, между которыми успевает вклиниться
+    вторая вкладка или повторное нажатие, - одна атомарная команда.
+    Если версия не совпала, но сохраненный выбор такой же, как присланный
+    (двойное нажатие "Сохранить"), это тоже успех.
+    Возвращает True и проставляет selection.pk и version при успехе,
+    False, если выбор успели изменить на другой.
+    Требует SQLite 3.35+ или PostgreSQL - см. checks.check_upsert_support.
+    """
+    table = connection.ops.quote_name(UserSelection._meta.db_table)
+    columns = ['user', 'day_menu', *UPSERT_FIELDS]
+    attnames = ['not_eating', *(f'{field}_id' for field in UserSelection.SELECTION_FIELDS)]
+    values = [selection.user_id, selection.day_menu_id, *(getattr(selection, name) for name in attnames)]
+    version = _column('version')
+    sql = (
+        f"INSERT INTO {table} ({', '.join(map(_column, columns))}, {version}) "
+        f"VALUES ({', '.join(['%s'] * len(values))}, 1) "
+        f"ON CONFLICT ({_column('user')}, {_column('day_menu')}) DO UPDATE SET "
+        + ', '.join(f"{_column(field)} = excluded.{_column(field)}" for field in UPSERT_FIELDS)
+        + f", {version} = {table}.{version} + 1 "
+        f"WHERE {table}.{version} = %s "
+        f"RETURNING {_column('id')}, {version}"
+    )
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*values, expected_version])
+            row = cursor.fetchone()
+        if row is None:
+            stored = UserSelection.objects.filter(
+                user_id=selection.user_id, day_menu_id=selection.day_menu_id
+            ).values_list('id', 'version', *attnames).first()
+            if stored is None or list(stored[2:]) != values[2:]:
+                return False
+            selection.pk, selection.version = stored[:2]
+            selection._state.adding = False
+            return True
+        selection.pk, selection.version = row
+        selection._state.adding = False
+        selection.sync_items()
+    return True
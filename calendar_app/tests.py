@@ -1,3 +1,132 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .archive import archive_menus_before, archive_weeks, week_menus
+from .classifier import DishIndex, dish_name_key
+from .models import ArchivedDay, CustomUser, DayMenu, DayMenuItem, FoodCategory, Meal, UserSelection
+from .selections import upsert_selection
+
+
+class DishIndexTests(SimpleTestCase):
+    """Запомненные решения о полноценных блюдах"""
+
+    def setUp(self):
+        self.index = DishIndex([
+            (dish_name_key('Рыба запеченная'), 'Рыба запеченная', False),
+            (dish_name_key('Плов с курицей'), 'Плов с курицей', True),
+        ])
+
+    def test_exact_key_is_applied(self):
+        self.assertIs(self.index.classify('плов, с курицей'), True)
+        self.assertIs(self.index.classify('Рыба запечённая'), False)
+        self.assertIsNone(self.index.suggest('Плов с курицей'))
+
+    def test_similar_name_is_only_suggested(self):
+        # Лишнее слово - гарнир, решение для блюда без него не подходит
+        self.assertIsNone(self.index.classify('Рыба запеченная с рисом'))
+        self.assertEqual(self.index.suggest('Рыба запеченная с рисом'), ('Рыба запеченная', False))
+        self.assertIsNone(self.index.suggest('Суп гороховый'))
+
+
+class ArchiveTests(TestCase):
+    """Архивация прошедших недель"""
+
+    def test_no_weeks_archives_nothing(self):
+        # Меню только на текущую и следующую неделю: архивировать нечего
+        today = timezone.localdate()
+        week_start = today - timedelta(days=today.weekday())
+        DayMenu.objects.create(date=week_start)
+        DayMenu.objects.create(date=week_start + timedelta(days=7))
+
+        self.assertEqual(week_menus([]), {})
+        self.assertEqual(archive_weeks([]), 0)
+        self.assertEqual(archive_menus_before(week_start), [])
+        self.assertFalse(ArchivedDay.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class UpsertSelectionTests(TestCase):
+    """Сохранение выбора с оптимистичной блокировкой по version"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='ivan', password='secret')
+        # День через две недели: срок выбора на него еще не прошел
+        today = timezone.localdate()
+        cls.day_menu = DayMenu.objects.create(date=today - timedelta(days=today.weekday()) + timedelta(days=14))
+        salads = FoodCategory.objects.create(name='Салаты')
+        soups = FoodCategory.objects.create(name='Супы')
+        cls.salad = Meal.objects.create(name='Винегрет', category=salads)
+        cls.other_salad = Meal.objects.create(name='Оливье', category=salads)
+        cls.soup = Meal.objects.create(name='Борщ', category=soups)
+        DayMenuItem.objects.bulk_create([
+            DayMenuItem(day_menu=cls.day_menu, meal=meal, category_id=meal.category_id, position=position)
+            for position, meal in enumerate([cls.salad, cls.other_salad, cls.soup])
+        ])
+
+    def selection(self, **fields):
+        return UserSelection(user=self.user, day_menu=self.day_menu, **fields)
+
+    def stored(self):
+        return UserSelection.objects.get(user=self.user, day_menu=self.day_menu)
+
+    def test_first_insert(self):
+        selection = self.selection(selected_salad=self.salad)
+        self.assertTrue(upsert_selection(selection, 0))
+        stored = self.stored()
+        self.assertEqual((selection.pk, selection.version), (stored.pk, 1))
+        self.assertEqual(stored.selected_salad, self.salad)
+        self.assertEqual(stored.selected_meals, {'Салаты': self.salad})
+
+    def test_update_with_current_version(self):
+        upsert_selection(self.selection(selected_salad=self.salad), 0)
+        selection = self.selection(selected_salad=self.other_salad, selected_soup=self.soup)
+        self.assertTrue(upsert_selection(selection, 1))
+        stored = self.stored()
+        self.assertEqual(stored.version, 2)
+        self.assertEqual(stored.selected_meals, {'Салаты': self.other_salad, 'Супы': self.soup})
+
+    def test_stale_version_is_rejected(self):
+        upsert_selection(self.selection(selected_salad=self.salad), 0)
+        upsert_selection(self.selection(selected_salad=self.other_salad), 1)
+        self.assertFalse(upsert_selection(self.selection(selected_soup=self.soup), 1))
+        stored = self.stored()
+        self.assertEqual(stored.version, 2)
+        self.assertEqual(stored.selected_meals, {'Салаты': self.other_salad})
+
+    def test_identical_resubmit_is_accepted(self):
+        upsert_selection(self.selection(selected_salad=self.salad), 0)
+        selection = self.selection(selected_salad=self.salad)
+        self.assertTrue(upsert_selection(selection, 0))
+        self.assertEqual((selection.pk, selection.version), (self.stored().pk, 1))
+
+    def test_not_eating_clears_dishes(self):
+        upsert_selection(self.selection(selected_salad=self.salad, selected_soup=self.soup), 0)
+        self.assertTrue(upsert_selection(self.selection(not_eating=True), 1))
+        stored = self.stored()
+        self.assertTrue(stored.not_eating)
+        self.assertIsNone(stored.selected_salad)
+        self.assertFalse(stored.items.exists())
+
+    @mock.patch('calendar_app.views.schedule_export')
+    def test_day_detail_conflict(self, schedule_export):
+        self.client.force_login(self.user)
+        url = reverse('day_detail', args=[self.day_menu.id])
+
+        response = self.client.post(url, {'version': 0, 'selected_salad': self.salad.id})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+        # Повторное нажатие с тем же выбором - не конфликт
+        response = self.client.post(url, {'version': 0, 'selected_salad': self.salad.id})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+        # Другой выбор по устаревшей версии - конфликт, показан сохраненный
+        response = self.client.post(url, {'version': 0, 'selected_salad': self.other_salad.id})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.context['form'].initial['selected_salad'], self.salad.id)
+        self.assertEqual(self.stored().selected_salad, self.salad)
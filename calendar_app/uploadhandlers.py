@@ -0,0 +1,90 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers
+from django.template.defaultfilters import filesizeformat
+
+# Файл xlsx - ZIP-архив и начинается с заголовка локального файла ZIP
+XLSX_SIGNATURE = b'PK\x03\x04'
+
+
+class HashedUploadedFile(UploadedFile):
+    """
+    Загруженное меню во временном файле в MEDIA_ROOT с уже посчитанным SHA-256:
+    store_upload переименовывает его в итоговый файл, не читая повторно.
+    """
+
+    def __init__(self, file, name, content_type, size, charset, sha256, content_type_extra=None):
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # Файл уже перенесен в хранилище под именем по хэшу
+            pass
+
+
+class MenuUploadHandler(FileUploadHandler):
+    """
+    Принимает файл меню (поле excel_file) потоком: каждый блок сразу пишется
+    на диск рядом с итоговым местом и добавляется в SHA-256, так что память
+    на загрузку не зависит от размера файла. Файлы больше MENU_UPLOAD_MAX_SIZE
+    и файлы без сигнатуры ZIP, с которой начинается любой xlsx, отбрасываются
+    еще до разбора, причина - в request.rejected_uploads. Остальные поля
+    передаются следующим обработчикам. Подключается только представлением home
+    и только для администраторов, остальные загрузки идут обычными обработчиками.
+    """
+    menu_field = 'excel_file'
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name == self.menu_field
+        if not self.active:
+            return
+        os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(suffix='.upload', dir=settings.MEDIA_ROOT)
+        self.digest = hashlib.sha256()
+        raise StopFutureHandlers()
+
+    def reject(self, message):
+        if not hasattr(self.request, 'rejected_uploads'):
+            self.request.rejected_uploads = {}
+        self.request.rejected_uploads[self.menu_field] = message
+        raise SkipFile(message)
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if start == 0 and not raw_data.startswith(XLSX_SIGNATURE):
+            self.reject("Файл не является книгой Excel .xlsx")
+        if start + len(raw_data) > settings.MENU_UPLOAD_MAX_SIZE:
+            self.reject(f"Файл больше {filesizeformat(settings.MENU_UPLOAD_MAX_SIZE)}")
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        file, self.active = self.file, False
+        # Файл передан дальше - закрывать его при пропуске следующих полей нельзя
+        del self.file
+        file.flush()
+        file.seek(0)
+        return HashedUploadedFile(
+            file=file,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            sha256=self.digest.hexdigest(),
+            content_type_extra=self.content_type_extra,
+        )
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api
 from .views import update_complete_dish_status
 
 urlpatterns = [
@@ -7,13 +7,22 @@ urlpatterns = [
     path('home/', views.home, name='home'),
     path('day/<int:day_id>/', views.day_detail, name='day_detail'),
     path('user-management/', views.user_management, name='user_management'),
+    path('user-management/bulk/', views.user_bulk_action, name='user_bulk_action'),
     path('create-user/', views.create_user, name='create_user'),
+    path('import-users/', views.import_users, name='import_users'),
     path('export-selections/', views.export_selections, name='export_selections'),
     path('clear-calendar/', views.clear_calendar, name='clear_calendar'),
     path('change-password/', views.change_password, name='change_password'),
     path('change-password/<int:user_id>/', views.change_password, name='change_user_password'),
     path('export-data/', views.export_data, name='export_data'),
+    path('reports/', views.reports, name='reports'),
+    path('kitchen/', views.kitchen, name='kitchen'),
+    path('reports/export/', views.export_reports, name='export_reports'),
     path('update-complete-dish-status/', update_complete_dish_status, name='update_complete_dish_status'),
     path('manage_dishes/', views.manage_dishes, name='manage_dishes'),
     path('clear-all-dishes/', views.clear_all_dishes, name='clear_all_dishes'),
+    path('api/menu/week/', api.week_menu, name='api_week_menu'),
+    path('api/menu/day/<int:day_id>/', api.day_menu, name='api_day_menu'),
+    path('api/selections/', api.my_selections, name='api_my_selections'),
+    path('api/kitchen-totals/', api.kitchen_totals, name='api_kitchen_totals'),
 ] 
\ No newline at end of file
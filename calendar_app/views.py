@@ -7,23 +7,44 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login, authenticate, logout
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
-from .models import CustomUser, Meal, DayMenu, UserSelection, FoodCategory
+from django.http import FileResponse, HttpResponse, JsonResponse
+from .models import CustomUser, Meal, DayMenu, DayMenuItem, UserSelection, FoodCategory, SelectionItem, DishForecast
 from .forms import UserRegistrationForm, MealUploadForm, UserSelectionForm
+from .menu_version import bump_menu_version, menu_last_modified, user_menu_etag, menu_etag
+from .parsers import parse_meal_name, read_menu_sheet, parse_menu_frame, parse_menu_workbook
+from .provisioning import read_user_file, provision_users
+from .classifier import COMPLETE_DISH_CATEGORY, classify_week_meals, load_dish_index, remember_complete_flags
+from .archive import archive_weeks, archive_menus_before, week_start_of
+from .exports import build_export, export_filename, remove_stale_week_exports, schedule_export
+from .deadline import is_day_locked, selection_deadline
+from .selections import upsert_selection
+from .uploadhandlers import MenuUploadHandler
+from .reports import build_reports, participation_totals, reports_workbook
+from .forecast import update_forecasts
+from .importer import (
+    import_menu_frame, import_menu_sites, store_upload, discard_upload, is_duplicate_upload,
+    record_upload, forget_last_import, cleanup_old_uploads
+)
 import pandas as pd
 from django.utils import timezone
 from django.contrib.auth.forms import PasswordChangeForm, SetPasswordForm
 from django.contrib.admin.views.decorators import staff_member_required
 from openpyxl import load_workbook
 from django.conf import settings
-from django.db.models import Count, Q
+from django.db import transaction
+from django.db.models import Count, Q, Prefetch, Value
+from django.db.models.functions import Concat, Lower
+from django.core.paginator import Paginator
+from django.urls import reverse
 import openpyxl
 from openpyxl.utils.cell import get_column_letter
 from openpyxl.styles import PatternFill, Font, Alignment
 from copy import copy
 import sys
 import traceback
-from django.views.decorators.http import require_http_methods, require_POST
+from django.views.decorators.http import require_http_methods, require_POST, condition
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 import json
 import tempfile
 from django.core.cache import cache
@@ -49,33 +70,6 @@ console_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 logger.addHandler(console_handler)
 
-def cleanup_old_files():
-    """Удаляет старые Excel файлы, оставляя только 8 самых новых"""
-    try:
-        # Получаем список всех Excel файлов в директории
-        excel_files = []
-        for file in os.listdir(settings.MEDIA_ROOT):
-            if file.endswith('.xlsx'):
-                file_path = os.path.join(settings.MEDIA_ROOT, file)
-                excel_files.append((file_path, os.path.getctime(file_path)))
-        
-        # Сортируем файлы по дате создания (от новых к старым)
-        excel_files.sort(key=lambda x: x[1], reverse=True)
-        
-        # Оставляем только 8 самых новых файлов
-        files_to_delete = excel_files[8:]
-        
-        # Удаляем старые файлы
-        for file_path, _ in files_to_delete:
-            try:
-                os.remove(file_path)
-                logger.info(f"Удален старый файл: {file_path}")
-            except Exception as e:
-                logger.error(f"Ошибка при удалении файла {file_path}: {str(e)}")
-                
-    except Exception as e:
-        logger.error(f"Ошибка при очистке старых файлов: {str(e)}")
-
 def login_view(request):
     if request.user.is_authenticated:
         return redirect('home')
@@ -106,7 +100,18 @@ def is_admin(user):
     return user.is_admin or user.is_superuser or user.is_staff
 
 @login_required
+@csrf_exempt
 def home(request):
+    # Файл меню от администратора принимается потоком на диск. Обработчик нужно
+    # добавить до чтения тела запроса, поэтому CSRF проверяется уже в _home
+    if request.method == 'POST' and (request.user.is_admin or request.user.is_superuser):
+        request.upload_handlers.insert(0, MenuUploadHandler(request))
+    return _home(request)
+
+@csrf_protect
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=user_menu_etag, last_modified_func=menu_last_modified)
+def _home(request):
     logger = logging.getLogger('calendar_app')
     
     # Get current and next week dates
@@ -115,36 +120,30 @@ def home(request):
     next_week_start = current_week_start + timedelta(days=7)
     
     try:
-        # Get menus data with user-specific selections
-        current_week_menu = DayMenu.objects.filter(
-            date__range=[current_week_start, current_week_start + timedelta(days=4)]
-        ).order_by('date').prefetch_related(
-            'userselection_set',
-            'salads', 'soups', 'main_courses', 'sides', 'bakery'
-        )
+        current_week_end = current_week_start + timedelta(days=4)
+        next_week_end = next_week_start + timedelta(days=4)
         
-        next_week_menu = DayMenu.objects.filter(
-            date__range=[next_week_start, next_week_start + timedelta(days=4)]
-        ).order_by('date').prefetch_related(
+        # Prefetch only the current user's selections, with the chosen meals joined in,
+        # so the cost does not grow with the number of employees
+        user_selections = Prefetch(
             'userselection_set',
-            'salads', 'soups', 'main_courses', 'sides', 'bakery'
+            queryset=UserSelection.objects.filter(user=request.user).select_related(
+                *UserSelection.SELECTION_FIELDS
+            ),
+            to_attr='user_selections'
         )
-
-        # Get user selections
-        user_selections = UserSelection.objects.filter(
-            user=request.user,
-            day_menu__date__range=[current_week_start, next_week_start + timedelta(days=4)]
-        ).select_related('day_menu')
-
-        # Create a mapping of day_menu_id to user_selection
-        selection_map = {sel.day_menu_id: sel for sel in user_selections}
-
+        
+        # Both weeks in one query
+        menus = DayMenu.objects.filter(
+            date__range=[current_week_start, next_week_end]
+        ).order_by('date', 'site').prefetch_related(user_selections)
+        
         # Attach user selections to menus
-        for menu in current_week_menu:
-            menu.user_selection = selection_map.get(menu.id)
+        for menu in menus:
+            menu.user_selection = menu.user_selections[0] if menu.user_selections else None
         
-        for menu in next_week_menu:
-            menu.user_selection = selection_map.get(menu.id)
+        current_week_menu = [menu for menu in menus if menu.date <= current_week_end]
+        next_week_menu = [menu for menu in menus if next_week_start <= menu.date <= next_week_end]
         
         context = {
             'current_week_menu': current_week_menu,
@@ -152,8 +151,17 @@ def home(request):
             'is_admin': is_admin(request.user),
             'current_week_start': current_week_start,
             'next_week_start': next_week_start,
+            'next_week_deadline': selection_deadline(next_week_start),
+            'next_week_locked': any(is_day_locked(menu) for menu in next_week_menu),
         }
 
+        # Файл, отклоненный обработчиком загрузки (размер, формат), в request.FILES не попадает
+        if request.method == 'POST' and not request.FILES.get('excel_file'):
+            rejected = getattr(request, 'rejected_uploads', {}).get('excel_file')
+            if rejected:
+                messages.error(request, f"Файл не загружен: {rejected}")
+                return redirect('home')
+
         # Handle file upload
         if request.method == 'POST' and request.FILES.get('excel_file'):
             if not (request.user.is_admin or request.user.is_superuser):
@@ -164,219 +172,260 @@ def home(request):
             logger.info(f"Processing file upload: {excel_file.name} ({excel_file.size} bytes)")
 
             # Validate file type
-            if not excel_file.name.lower().endswith(('.xlsx', '.xls')):
-                messages.error(request, "Файл должен быть в формате Excel (.xlsx или .xls)")
+            if not excel_file.name.lower().endswith('.xlsx'):
+                messages.error(request, "Файл должен быть в формате Excel (.xlsx)")
                 return render(request, 'calendar_app/home.html', context)
 
+            file_path = None
             try:
-                # Save the file
-                os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                file_path = os.path.join(settings.MEDIA_ROOT, f'menu_{timestamp}.xlsx')
-                
-                with open(file_path, 'wb+') as destination:
-                    for chunk in excel_file.chunks():
-                        destination.write(chunk)
+                # Save the file under its content hash
+                file_path, file_hash = store_upload(excel_file)
                 logger.info(f"File saved to: {file_path}")
                 
-                # Очищаем старые файлы после успешной загрузки
-                cleanup_old_files()
+                # Choose parser based on the submitted value
+                parser_type = request.POST.get('parser_type', 'standard')
                 
-                # Получаем все блюда, которые используются в текущем и следующем меню
-                current_week_end = current_week_start + timedelta(days=4)
-                next_week_end = next_week_start + timedelta(days=4)
+                # Тот же файл уже импортирован - повторный импорт ничего не изменит
+                if is_duplicate_upload(file_hash, parser_type, next_week_start):
+                    logger.info(f"File {file_hash} is already imported, skipping")
+                    messages.info(request, "Это меню уже загружено, повторный импорт не требуется")
+                    return redirect('home')
                 
-                used_meals = Meal.objects.filter(
-                    Q(day_menus_as_salad__date__range=[current_week_start, current_week_end]) |
-                    Q(day_menus_as_soup__date__range=[current_week_start, current_week_end]) |
-                    Q(day_menus_as_main__date__range=[current_week_start, current_week_end]) |
-                    Q(day_menus_as_side__date__range=[current_week_start, current_week_end]) |
-                    Q(day_menus_as_bakery__date__range=[current_week_start, current_week_end]) |
-                    Q(day_menus_as_salad__date__range=[next_week_start, next_week_end]) |
-                    Q(day_menus_as_soup__date__range=[next_week_start, next_week_end]) |
-                    Q(day_menus_as_main__date__range=[next_week_start, next_week_end]) |
-                    Q(day_menus_as_side__date__range=[next_week_start, next_week_end]) |
-                    Q(day_menus_as_bakery__date__range=[next_week_start, next_week_end])
-                ).distinct()
+                # Листы разбираются до начала транзакции: разбор не трогает базу,
+                # и пока он идет, база не заблокирована на запись
+                if parser_type == 'frame':
+                    records = parse_menu_frame(read_menu_sheet(file_path))
+                elif parser_type == 'multisite':
+                    # Every sheet is a separate site menu, sheets are parsed in parallel
+                    records_by_site = parse_menu_workbook(file_path, max_workers=settings.MENU_IMPORT_WORKERS)
+
+                # Все изменения базы - одна транзакция: ошибка на любом шаге возвращает
+                # календарь в прежнее состояние, и SQLite фиксирует запись один раз.
+                # Шаги, ошибки которых допустимы, выполняются в точках сохранения
+                with transaction.atomic():
+                    # Получаем все блюда, которые используются в текущем и следующем меню
+                    used_meals = Meal.objects.filter(
+                        Q(menu_items__day_menu__date__range=[current_week_start, current_week_end]) |
+                        Q(menu_items__day_menu__date__range=[next_week_start, next_week_end])
+                    ).distinct()
                 
-                # Удаляем только те блюда, которые не используются в меню
-                Meal.objects.exclude(id__in=used_meals.values_list('id', flat=True)).delete()
-                logger.info("Cleared unused dishes before importing new ones")
+                    # Удаляем только те блюда, которые не используются в меню
+                    Meal.objects.exclude(id__in=used_meals.values_list('id', flat=True)).delete()
+                    logger.info("Cleared unused dishes before importing new ones")
                 
-                # Move next week's menus to current week if they exist
-                next_week_menus = DayMenu.objects.filter(
-                    date__range=[next_week_start, next_week_start + timedelta(days=4)]
-                ).order_by('date')
+                    # Move next week's menus to current week if they exist
+                    next_week_menus = DayMenu.objects.filter(
+                        date__range=[next_week_start, next_week_start + timedelta(days=4)]
+                    ).order_by('date', 'site')
 
-                if next_week_menus.exists():
-                    logger.info("Found existing menus for next week, moving them to current week")
+                    if next_week_menus.exists():
+                        logger.info("Found existing menus for next week, moving them to current week")
                     
-                    # First, delete current week's menus
-                    DayMenu.objects.filter(
-                        date__range=[current_week_start, current_week_start + timedelta(days=4)]
-                    ).delete()
-                    logger.info("Deleted current week's menus")
+                        # First, archive and delete current week's menus. The moved menus
+                        # take the same dates, so reports read this week from them until
+                        # it is archived again, which replaces these totals
+                        archive_weeks([current_week_start])
+                        DayMenu.objects.filter(
+                            date__range=[current_week_start, current_week_start + timedelta(days=4)]
+                        ).delete()
+                        logger.info("Deleted current week's menus")
                     
-                    # Move next week's menus to current week
-                    for day_offset in range(5):  # Monday to Friday
-                        try:
-                            menu = next_week_menus[day_offset]
-                            old_date = menu.date
-                            new_date = current_week_start + timedelta(days=day_offset)
+                        # Move next week's menus to current week (every site, same weekday)
+                        for menu in next_week_menus:
+                            try:
+                                with transaction.atomic():
+                                    old_date = menu.date
+                                    new_date = old_date - timedelta(days=7)
                             
-                            # Create new menu for current week
-                            new_menu = DayMenu.objects.create(date=new_date)
+                                    # Create new menu for current week
+                                    new_menu = DayMenu.objects.create(date=new_date, site=menu.site, upload=menu.upload)
                             
-                            # Copy all relations
-                            new_menu.salads.set(menu.salads.all())
-                            new_menu.soups.set(menu.soups.all())
-                            new_menu.main_courses.set(menu.main_courses.all())
-                            new_menu.sides.set(menu.sides.all())
-                            new_menu.bakery.set(menu.bakery.all())
+                                    # Copy all meals in one insert
+                                    DayMenuItem.objects.bulk_create([
+                                        DayMenuItem(
+                                            day_menu=new_menu,
+                                            meal_id=item.meal_id,
+                                            category_id=item.category_id,
+                                            position=item.position
+                                        )
+                                        for item in menu.items.all()
+                                    ])
                             
-                            # Copy user selections
-                            for selection in menu.userselection_set.all():
-                                UserSelection.objects.create(
-                                    user=selection.user,
-                                    day_menu=new_menu,
-                                    selected_salad=selection.selected_salad,
-                                    selected_soup=selection.selected_soup,
-                                    selected_main=selection.selected_main,
-                                    selected_side=selection.selected_side,
-                                    selected_bakery=selection.selected_bakery
-                                )
+                                    # Copy user selections
+                                    for selection in menu.userselection_set.all():
+                                        UserSelection.objects.create(
+                                            user=selection.user,
+                                            day_menu=new_menu,
+                                            selected_salad=selection.selected_salad,
+                                            selected_soup=selection.selected_soup,
+                                            selected_main=selection.selected_main,
+                                            selected_side=selection.selected_side,
+                                            selected_bakery=selection.selected_bakery
+                                        )
                             
-                            logger.info(f"Copied menu from {old_date} to {new_date} with all selections")
-                        except IndexError:
-                            logger.warning(f"No menu found for day offset {day_offset}")
-                        except Exception as e:
-                            logger.error(f"Error copying menu: {str(e)}")
+                                    logger.info(f"Copied menu from {old_date} to {new_date} with all selections")
+                            except Exception as e:
+                                logger.error(f"Error copying menu: {str(e)}")
+
+                    # Delete any remaining next week's menus
+                    DayMenu.objects.filter(
+                        date__range=[next_week_start, next_week_start + timedelta(days=4)]
+                    ).delete()
+                    logger.info("Deleted any remaining next week's menus")
 
-                # Delete any remaining next week's menus
-                DayMenu.objects.filter(
-                    date__range=[next_week_start, next_week_start + timedelta(days=4)]
-                ).delete()
-                logger.info("Deleted any remaining next week's menus")
+                    logger.info(f"Using {parser_type} parser")
 
-                # Choose parser based on the submitted value
-                parser_type = request.POST.get('parser_type', 'standard')
-                logger.info(f"Using {parser_type} parser")
-
-                if parser_type == 'smart':
-                    # Use smart parser
-                    parse_excel_smart(file_path, next_week_start)
-                    messages.success(request, "Меню успешно загружено с использованием умного парсера")
-                else:
-                    # Use standard parser
-                    wb = load_workbook(file_path, data_only=True)
-                    ws = wb.active
-                    logger.info(f"Loaded Excel file, max row: {ws.max_row}, max column: {ws.max_column}")
+                    if parser_type == 'smart':
+                        # Use smart parser
+                        parse_excel_smart(file_path, next_week_start)
+                        success_message = "Меню успешно загружено с использованием умного парсера"
+                    elif parser_type == 'frame':
+                        # Bulk DB writes of the frame parsed before the transaction
+                        import_menu_frame(records, next_week_start)
+                        success_message = "Меню успешно загружено"
+                        logger.info("Menu import completed successfully")
+                    elif parser_type == 'multisite':
+                        # Sheets were parsed in parallel before the transaction
+                        import_menu_sites(records_by_site, next_week_start)
+                        success_message = f"Меню загружено для площадок: {len(records_by_site)}"
+                        logger.info("Multi-site menu import completed successfully")
+                    else:
+                        # Use standard parser
+                        wb = load_workbook(file_path, data_only=True)
+                        ws = wb.active
+                        logger.info(f"Loaded Excel file, max row: {ws.max_row}, max column: {ws.max_column}")
                     
-                    # Map days to Excel columns
-                    day_columns = {
-                        0: 'B',  # Понедельник
-                        1: 'D',  # Вторник
-                        2: 'F',  # Среда
-                        3: 'H',  # Четверг
-                        4: 'J'   # Пятница
-                    }
-
-                    # Category mappings (name to model field)
-                    category_mappings = {
-                        'салаты': ('Салаты', 'salads'),
-                        'супы': ('Супы', 'soups'),
-                        'горячие блюда': ('Горячие блюда', 'main_courses'),
-                        'горячее': ('Горячие блюда', 'main_courses'),
-                        'гарниры': ('Гарниры', 'sides'),
-                        'выпечка': ('Выпечка', 'bakery')
-                    }
-
-                    # First, verify the structure
-                    logger.info("Verifying Excel structure...")
-                    for col in day_columns.values():
-                        day_cell = ws[f'{col}2']
-                        if not day_cell.value:
-                            logger.warning(f"No day found in cell {col}2")
-
-                    # Create food categories if they don't exist
-                    unique_categories = set(cat[0] for cat in category_mappings.values())
-                    for category_name in unique_categories:
-                        cat, created = FoodCategory.objects.get_or_create(name=category_name)
-                        logger.info(f"Category {category_name}: {'created' if created else 'already exists'}")
-
-                    # Read category positions from column A
-                    category_positions = {}
-                    current_category = None
-                    category_start = None
-
-                    # Scan column A for categories and their positions
-                    for row in range(3, ws.max_row + 1):
-                        cell_value = ws[f'A{row}'].value
-                        if cell_value and isinstance(cell_value, str):
-                            cell_value = cell_value.lower().strip()
+                        # Map days to Excel columns
+                        day_columns = {
+                            0: 'B',  # Понедельник
+                            1: 'D',  # Вторник
+                            2: 'F',  # Среда
+                            3: 'H',  # Четверг
+                            4: 'J'   # Пятница
+                        }
+
+                        # Category mappings (label in column A to category name)
+                        category_mappings = {
+                            'салаты': 'Салаты',
+                            'супы': 'Супы',
+                            'горячие блюда': 'Горячие блюда',
+                            'горячее': 'Горячие блюда',
+                            'гарниры': 'Гарниры',
+                            'выпечка': 'Выпечка'
+                        }
+
+                        # First, verify the structure
+                        logger.info("Verifying Excel structure...")
+                        for col in day_columns.values():
+                            day_cell = ws[f'{col}2']
+                            if not day_cell.value:
+                                logger.warning(f"No day found in cell {col}2")
+
+                        # Create food categories if they don't exist
+                        unique_categories = set(category_mappings.values())
+                        for category_name in unique_categories:
+                            cat, created = FoodCategory.objects.get_or_create(name=category_name)
+                            logger.info(f"Category {category_name}: {'created' if created else 'already exists'}")
+
+                        # Read category positions from column A
+                        category_positions = {}
+                        current_category = None
+                        category_start = None
+
+                        # Scan column A for categories and their positions
+                        for row in range(3, ws.max_row + 1):
+                            cell_value = ws[f'A{row}'].value
+                            if cell_value and isinstance(cell_value, str):
+                                cell_value = cell_value.lower().strip()
                             
-                            # Check if this is a category
-                            for cat_key in category_mappings.keys():
-                                if cat_key in cell_value:
-                                    if current_category and category_start:
-                                        category_positions[current_category] = (category_start, row - 1)
-                                    current_category = category_mappings[cat_key][0]
-                                    category_start = row
-                                    break
-
-                    # Add the last category range
-                    if current_category and category_start:
-                        category_positions[current_category] = (category_start, ws.max_row)
-
-                    logger.info("Found category positions:")
-                    for category, (start, end) in category_positions.items():
-                        logger.info(f"{category}: rows {start}-{end}")
-
-                    # Process each day of the week
-                    for day_offset, col in day_columns.items():
-                        date = next_week_start + timedelta(days=day_offset)
-                        menu = DayMenu.objects.create(date=date)
-                        logger.info(f"Created menu for {date}")
-
-                        # Process each category
-                        for category_name, positions in category_positions.items():
-                            start_row, end_row = positions
-                            field_name = next(field for cat, field in category_mappings.values() 
-                                            if cat == category_name)
+                                # Check if this is a category
+                                for cat_key in category_mappings.keys():
+                                    if cat_key in cell_value:
+                                        if current_category and category_start:
+                                            category_positions[current_category] = (category_start, row - 1)
+                                        current_category = category_mappings[cat_key]
+                                        category_start = row
+                                        break
+
+                        # Add the last category range
+                        if current_category and category_start:
+                            category_positions[current_category] = (category_start, ws.max_row)
+
+                        logger.info("Found category positions:")
+                        for category, (start, end) in category_positions.items():
+                            logger.info(f"{category}: rows {start}-{end}")
+
+                        # Process each day of the week
+                        for day_offset, col in day_columns.items():
+                            date = next_week_start + timedelta(days=day_offset)
+                            menu = DayMenu.objects.create(date=date)
+                            logger.info(f"Created menu for {date}")
+
+                            # Process each category
+                            for category_name, positions in category_positions.items():
+                                start_row, end_row = positions
                             
-                            # Get or create meals in this category
-                            for row in range(start_row, end_row + 1):
-                                cell_value = ws[f'{col}{row}'].value
-                                if cell_value:
-                                    name, description = parse_meal_name(str(cell_value))
-                                    if name:
-                                        try:
-                                            # Create new meal
-                                            category = FoodCategory.objects.get(name=category_name)
-                                            meal = Meal.objects.create(
-                                                name=name,
-                                                description=description,
-                                                category=category,
-                                                excel_row=row
-                                            )
-                                            logger.info(f"Created new meal: {name} at row {row}")
+                                # Get or create meals in this category
+                                for row in range(start_row, end_row + 1):
+                                    cell_value = ws[f'{col}{row}'].value
+                                    if cell_value:
+                                        name, description = parse_meal_name(str(cell_value))
+                                        if name:
+                                            try:
+                                                with transaction.atomic():
+                                                    # Create new meal
+                                                    category = FoodCategory.objects.get(name=category_name)
+                                                    meal = Meal.objects.create(
+                                                        name=name,
+                                                        description=description,
+                                                        category=category,
+                                                        excel_row=row
+                                                    )
+                                                    logger.info(f"Created new meal: {name} at row {row}")
                                             
-                                            # Add meal to the appropriate menu field
-                                            getattr(menu, field_name).add(meal)
-                                            logger.info(f"Added {name} to {field_name} for {date}")
-                                        except Exception as e:
-                                            logger.error(f"Error creating meal '{name}': {str(e)}")
-
-                    messages.success(request, "Меню успешно загружено")
-                    logger.info("Menu import completed successfully")
-                    
-                    # Redirect to manage_dishes page after successful upload
-                    return redirect('manage_dishes')
+                                                    # Add meal to the day menu
+                                                    DayMenuItem.objects.create(
+                                                        day_menu=menu, meal=meal, category=category, position=row
+                                                    )
+                                                    logger.info(f"Added {name} to {category_name} for {date}")
+                                            except Exception as e:
+                                                logger.error(f"Error creating meal '{name}': {str(e)}")
 
-                return redirect('home')
+                        success_message = "Меню успешно загружено"
+                        logger.info("Menu import completed successfully")
+
+                    # Горячие блюда получают флаг полноценности по прошлым решениям администратора
+                    complete_count, unknown_count = classify_week_meals(next_week_start)
+
+                    # Прогноз порций для кухни по истории тех же блюд: без него меню все равно загружено
+                    try:
+                        update_forecasts(next_week_start)
+                    except Exception as e:
+                        logger.warning(f"Forecast update failed: {str(e)}", exc_info=True)
+
+                    record_upload(file_path, file_hash, parser_type, next_week_start, user=request.user)
+
+                messages.success(request, success_message)
+                if complete_count:
+                    messages.info(request, f"Автоматически отмечено полноценных блюд: {complete_count}")
+                
+                bump_menu_version()
+                schedule_export(next_week_start)
+                
+                # Очищаем старые файлы после успешной загрузки
+                cleanup_old_uploads()
+                remove_stale_week_exports()
+                
+                # Redirect to manage_dishes page after successful upload,
+                # unless every hot dish was already classified
+                if parser_type == 'smart' or not unknown_count:
+                    return redirect('home')
+                return redirect('manage_dishes')
                 
             except Exception as e:
                 logger.error(f"Error handling file: {str(e)}", exc_info=True)
+                if file_path:
+                    discard_upload(file_path, file_hash)
                 messages.error(request, f"Ошибка при обработке файла: {str(e)}")
                 return render(request, 'calendar_app/home.html', context)
 
@@ -393,17 +442,47 @@ def home(request):
             'next_week_start': next_week_start,
         })
 
+# Категории на странице выбора: название, иконка, эмодзи, поле формы
+MENU_CATEGORY_DISPLAY = [
+    ('Салаты', 'fas fa-leaf', '🥗', 'selected_salad'),
+    ('Супы', 'fas fa-soup', '🍲', 'selected_soup'),
+    ('Горячие блюда', 'fas fa-drumstick-bite', '🍖', 'selected_main'),
+    ('Гарниры', 'fas fa-carrot', '🥘', 'selected_side'),
+    ('Выпечка', 'fas fa-bread-slice', '🥨', 'selected_bakery'),
+]
+
+def menu_categories(day_menu):
+    """Категории меню с блюдами, загруженными одним запросом"""
+    meals = day_menu.meals_by_category()
+    return [
+        (category, icon, emoji, field, meals.get(category, []))
+        for category, icon, emoji, field in MENU_CATEGORY_DISPLAY
+    ]
+
+def day_detail_context(day_menu, form, is_locked):
+    """Контекст страницы выбора - один и тот же для формы, ошибок и конфликта"""
+    return {
+        'day_menu': day_menu,
+        'form': form,
+        'categories': menu_categories(day_menu),
+        'is_locked': is_locked,
+        'selection_deadline': selection_deadline(week_start_of(day_menu.date)),
+    }
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=user_menu_etag, last_modified_func=menu_last_modified)
 def day_detail(request, day_id):
     try:
         day_menu = get_object_or_404(DayMenu, id=day_id)
         user_selection = UserSelection.objects.filter(user=request.user, day_menu=day_menu).first()
         
-        current_date = timezone.now().date()
-        current_week_start = current_date - timedelta(days=current_date.weekday())
-        next_week_start = current_week_start + timedelta(days=7)
+        is_locked = is_day_locked(day_menu)
         
         if request.method == 'POST':
+            if is_locked:
+                messages.error(request, 'Выбор на этот день уже закрыт')
+                return redirect('day_detail', day_id=day_menu.id)
             form = UserSelectionForm(request.POST, instance=user_selection)
             if form.is_valid():
                 selection = form.save(commit=False)
@@ -413,18 +492,7 @@ def day_detail(request, day_id):
                 # Проверяем конфликты между полноценным блюдом и гарниром
                 if selection.selected_main and selection.selected_main.is_complete_dish and selection.selected_side:
                     form.add_error('selected_side', 'Нельзя выбрать гарнир к полноценному блюду')
-                    return render(request, 'calendar_app/day_detail.html', {
-                        'day_menu': day_menu,
-                        'form': form,
-                        'categories': [
-                            ('Салаты', 'fas fa-leaf', '🥗', 'selected_salad', day_menu.salads.all()),
-                            ('Супы', 'fas fa-soup', '🍲', 'selected_soup', day_menu.soups.all()),
-                            ('Горячие блюда', 'fas fa-drumstick-bite', '🍖', 'selected_main', day_menu.main_courses.all()),
-                            ('Гарниры', 'fas fa-carrot', '🥘', 'selected_side', day_menu.sides.all()),
-                            ('Выпечка', 'fas fa-bread-slice', '🥨', 'selected_bakery', day_menu.bakery.all()),
-                        ],
-                        'next_week_start': next_week_start,
-                    })
+                    return render(request, 'calendar_app/day_detail.html', day_detail_context(day_menu, form, is_locked))
                 
                 # Если выбрана опция "НЕ ЕМ", очищаем все выбранные блюда
                 if selection.not_eating:
@@ -434,14 +502,24 @@ def day_detail(request, day_id):
                     selection.selected_side = None
                     selection.selected_bakery = None
                 
-                selection.save()
+                if not upsert_selection(selection, form.cleaned_data['version'] or 0):
+                    # Выбор успели изменить в другой вкладке или повторным нажатием - показываем сохраненный
+                    messages.warning(request, 'Выбор на этот день уже был изменен. Показан сохраненный вариант, проверьте его.')
+                    form = UserSelectionForm(instance=UserSelection.objects.get(user=request.user, day_menu=day_menu))
+                    return render(
+                        request, 'calendar_app/day_detail.html',
+                        day_detail_context(day_menu, form, is_locked), status=409
+                    )
+                bump_menu_version()
+                schedule_export(week_start_of(day_menu.date))
                 messages.success(request, 'Ваш выбор успешно сохранен!')
                 
                 # Если нажата кнопка "Далее", перенаправляем на следующий день
                 if 'save_and_next' in request.POST:
                     # Находим следующий день в текущей неделе
                     next_day = DayMenu.objects.filter(
-                        date__gt=day_menu.date
+                        date__gt=day_menu.date,
+                        site=day_menu.site
                     ).order_by('date').first()
                     
                     if next_day:
@@ -455,22 +533,7 @@ def day_detail(request, day_id):
         else:
             form = UserSelectionForm(instance=user_selection)
         
-        categories = [
-            ('Салаты', 'fas fa-leaf', '🥗', 'selected_salad', day_menu.salads.all()),
-            ('Супы', 'fas fa-soup', '🍲', 'selected_soup', day_menu.soups.all()),
-            ('Горячие блюда', 'fas fa-drumstick-bite', '🍖', 'selected_main', day_menu.main_courses.all()),
-            ('Гарниры', 'fas fa-carrot', '🥘', 'selected_side', day_menu.sides.all()),
-            ('Выпечка', 'fas fa-bread-slice', '🥨', 'selected_bakery', day_menu.bakery.all()),
-        ]
-        
-        context = {
-            'day_menu': day_menu,
-            'form': form,
-            'categories': categories,
-            'next_week_start': next_week_start,
-        }
-        
-        return render(request, 'calendar_app/day_detail.html', context)
+        return render(request, 'calendar_app/day_detail.html', day_detail_context(day_menu, form, is_locked))
     except DayMenu.DoesNotExist:
         messages.error(request, 'Меню не найдено')
         return redirect('home')
@@ -478,27 +541,80 @@ def day_detail(request, day_id):
         messages.error(request, f'Произошла ошибка: {str(e)}')
         return redirect('home')
 
+USERS_PER_PAGE = 50
+
+USER_ACTIONS = {
+    'make_admin': 'Назначено администраторов',
+    'remove_admin': 'Сняты права администратора',
+    'delete': 'Удалено пользователей',
+}
+
+
+def search_users(query):
+    """
+    Пользователи, чье имя начинается с query, без учета регистра.
+    Сравнение диапазоном по LOWER(username) использует индекс
+    user_username_lower_idx, в отличие от LIKE.
+    """
+    users = CustomUser.objects.select_related('created_by').order_by('username')
+    if not query:
+        return users
+    prefix = Lower(Value(query))
+    return users.alias(username_lower=Lower('username')).filter(
+        username_lower__gte=prefix,
+        username_lower__lt=Concat(prefix, Value('\U0010ffff'))
+    )
+
+
+def apply_user_action(request, user_ids, action):
+    """
+    Применяет действие сразу к набору пользователей одним запросом.
+    Суперпользователи не затрагиваются, себя удалить нельзя.
+    Возвращает число измененных пользователей.
+    """
+    users = CustomUser.objects.filter(id__in=user_ids, is_superuser=False)
+    if action == 'make_admin':
+        return users.update(is_admin=True)
+    if action == 'remove_admin':
+        return users.update(is_admin=False)
+    if action == 'delete':
+        return users.exclude(id=request.user.id).delete()[1].get(CustomUser._meta.label, 0)
+    return 0
+
+
 @user_passes_test(is_admin)
 def user_management(request):
     if request.method == 'POST':
-        user_id = request.POST.get('user_id')
-        action = request.POST.get('action')
-        user = get_object_or_404(CustomUser, id=user_id)
-        
-        if action == 'make_admin':
-            user.is_admin = True
-            user.save()
-            messages.success(request, f'Пользователь {user.username} теперь администратор')
-        elif action == 'remove_admin':
-            user.is_admin = False
-            user.save()
-            messages.success(request, f'Права администратора удалены у пользователя {user.username}')
-        elif action == 'delete':
-            user.delete()
-            messages.success(request, f'Пользователь {user.username} удален')
-    
-    users = CustomUser.objects.all()
-    return render(request, 'calendar_app/user_management.html', {'users': users})
+        # Кнопки в строке таблицы - то же массовое действие для одного пользователя
+        return user_bulk_action(request)
+
+    query = request.GET.get('q', '').strip()
+    page = Paginator(search_users(query), USERS_PER_PAGE).get_page(request.GET.get('page'))
+    return render(request, 'calendar_app/user_management.html', {
+        'users': page.object_list,
+        'page': page,
+        'query': query,
+    })
+
+
+@user_passes_test(is_admin)
+@require_POST
+def user_bulk_action(request):
+    action = request.POST.get('action')
+    user_ids = [user_id for user_id in request.POST.getlist('user_ids') if user_id.isdigit()]
+    if action not in USER_ACTIONS:
+        messages.error(request, 'Неизвестное действие')
+    elif not user_ids:
+        messages.error(request, 'Не выбраны пользователи')
+    else:
+        count = apply_user_action(request, user_ids, action)
+        messages.success(request, f'{USER_ACTIONS[action]}: {count}')
+
+    # Возвращаемся на ту же страницу поиска
+    next_url = reverse('user_management')
+    if request.POST.get('return_query'):
+        next_url += '?' + request.POST['return_query']
+    return redirect(next_url)
 
 @user_passes_test(is_admin)
 def create_user(request):
@@ -515,21 +631,52 @@ def create_user(request):
     
     return render(request, 'calendar_app/create_user.html', {'form': form})
 
+@user_passes_test(is_admin)
+def import_users(request):
+    """Массовое создание пользователей из CSV/XLSX"""
+    context = {}
+    if request.method == 'POST':
+        users_file = request.FILES.get('users_file')
+        if not users_file:
+            messages.error(request, 'Файл не выбран')
+            return redirect('import_users')
+        try:
+            rows = read_user_file(users_file)
+        except Exception as e:
+            messages.error(request, f'Не удалось прочитать файл: {str(e)}')
+            return redirect('import_users')
+
+        created, errors = provision_users(rows, created_by=request.user)
+        if created:
+            messages.success(request, f'Создано пользователей: {len(created)}')
+        if errors:
+            messages.warning(request, f'Строк с ошибками: {len(errors)}')
+        context = {
+            'created': created,
+            'generated': [(username, password) for username, password in created if password],
+            'errors': errors,
+        }
+
+    return render(request, 'calendar_app/import_users.html', context)
+
 @user_passes_test(is_admin)
 def export_selections(request):
-    selections = UserSelection.objects.all().select_related('user', 'day_menu')
+    selections = UserSelection.objects.all().select_related('user', 'day_menu').prefetch_related(
+        'items__meal', 'items__category'
+    )
     data = []
     
     for selection in selections:
-        data.append({
+        meals = selection.selected_meals
+        row = {
             'User': selection.user.username,
             'Date': selection.day_menu.date,
             'Day': selection.day_menu.get_day_display(),
-            'Selected Salad': selection.selected_salad.name,
-            'Selected Soup': selection.selected_soup.name,
-            'Selected Main Course': selection.selected_main.name,
-            'Selected Bakery': selection.selected_bakery.name,
-        })
+        }
+        for category_name in UserSelection.SELECTION_FIELDS.values():
+            meal = meals.get(category_name)
+            row[category_name] = meal.name if meal else ''
+        data.append(row)
     
     df = pd.DataFrame(data)
     response = HttpResponse(content_type='application/ms-excel')
@@ -537,12 +684,99 @@ def export_selections(request):
     df.to_excel(response, index=False)
     return response
 
+def report_period(request):
+    """Период отчета из date_from/date_to, по умолчанию - последние три месяца"""
+    today = timezone.now().date()
+    try:
+        date_from = datetime.strptime(request.GET['date_from'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        date_from = (today.replace(day=1) - timedelta(days=62)).replace(day=1)
+    try:
+        date_to = datetime.strptime(request.GET['date_to'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        date_to = today
+    return date_from, date_to
+
+@user_passes_test(is_admin)
+def reports(request):
+    date_from, date_to = report_period(request)
+    data = build_reports(date_from, date_to)
+    return render(request, 'calendar_app/reports.html', {
+        'date_from': date_from,
+        'date_to': date_to,
+        'popularity': data['popularity'].head(50).to_dict('records'),
+        'waste': data['waste'].to_dict('records'),
+        'participation': participation_totals(data['participation']).to_dict('records'),
+    })
+
+@user_passes_test(is_admin)
+def export_reports(request):
+    date_from, date_to = report_period(request)
+    response = HttpResponse(
+        reports_workbook(build_reports(date_from, date_to)),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = f'attachment; filename="reports_{date_from}_{date_to}.xlsx"'
+    return response
+
+@user_passes_test(is_admin)
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=menu_etag, last_modified_func=menu_last_modified)
+def kitchen(request):
+    """Прогноз порций рядом с текущим числом заказов на неделю"""
+    today = timezone.now().date()
+    week_start = today - timedelta(days=today.weekday())
+    if request.GET.get('week') != 'current':
+        week_start += timedelta(days=7)
+    week_range = [week_start, week_start + timedelta(days=4)]
+
+    forecasts = {
+        (day_menu_id, meal_id): portions
+        for day_menu_id, meal_id, portions in DishForecast.objects.filter(
+            day_menu__date__range=week_range
+        ).values_list('day_menu_id', 'meal_id', 'portions')
+    }
+    live_counts = {
+        (day_menu_id, meal_id): count
+        for day_menu_id, meal_id, count in SelectionItem.objects.filter(
+            user_selection__day_menu__date__range=week_range,
+            user_selection__not_eating=False
+        ).values_list('user_selection__day_menu_id', 'meal_id').annotate(count=Count('id'))
+    }
+
+    days = {}
+    for item in DayMenuItem.objects.filter(day_menu__date__range=week_range).order_by(
+        'day_menu__date', 'day_menu__site', 'position'
+    ).values('day_menu_id', 'day_menu__date', 'day_menu__site', 'meal_id', 'meal__name', 'category__name'):
+        day = days.setdefault(item['day_menu_id'], {
+            'date': item['day_menu__date'],
+            'site': item['day_menu__site'],
+            'dishes': [],
+        })
+        key = (item['day_menu_id'], item['meal_id'])
+        day['dishes'].append({
+            'category': item['category__name'],
+            'name': item['meal__name'],
+            'forecast': forecasts.get(key),
+            'ordered': live_counts.get(key, 0),
+        })
+
+    return render(request, 'calendar_app/kitchen.html', {
+        'days': days.values(),
+        'week_start': week_start,
+        'is_current_week': request.GET.get('week') == 'current',
+    })
+
 @user_passes_test(lambda u: u.is_superuser)
 def clear_calendar(request):
     if request.method == 'POST':
         try:
-            # Delete all menus and related selections
+            # Keep totals of past and current weeks, then delete all menus and related selections
+            today = timezone.now().date()
+            archive_menus_before(today - timedelta(days=today.weekday()) + timedelta(days=7))
             DayMenu.objects.all().delete()
+            remove_stale_week_exports()
+            bump_menu_version()
             messages.success(request, 'Календарь успешно очищен')
         except Exception as e:
             messages.error(request, f'Ошибка при очистке календаря: {str(e)}')
@@ -606,139 +840,39 @@ def get_category_rows():
     }
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=menu_etag, last_modified_func=menu_last_modified)
 def export_data(request):
     logger = logging.getLogger(__name__)
     
     # Получаем даты для следующей недели
     today = timezone.now().date()
     next_week_start = today + timedelta(days=(7 - today.weekday()))
-    next_week_end = next_week_start + timedelta(days=4)
-    
-    logger.info(f"Готовим данные для экспорта: {next_week_start} - {next_week_end}")
     
     try:
-        # Получаем меню на следующую неделю
-        menus = DayMenu.objects.filter(
-            date__range=[next_week_start, next_week_end]
-        ).order_by('date')
-        
-        logger.info(f"Найдено меню: {menus.count()} дней")
+        # Выгрузка текущей версии недели обычно уже собрана фоновой задачей
+        # или задачей закрытия недели - тогда ответ только читает файл с диска
+        path = build_export(next_week_start)
+        logger.info(f"Отдаем выгрузку: {path}")
         
-        if not menus.exists():
-            messages.error(request, "Меню на следующую неделю не найдено")
-            return redirect('home')
-        
-        # Ищем файл меню в директории
-        menu_files = [f for f in os.listdir(settings.MEDIA_ROOT) if f.startswith('menu_') and f.endswith('.xlsx')]
-        if not menu_files:
-            messages.error(request, "Файл меню не найден")
-            return redirect('home')
-            
-        # Берем самый последний файл
-        latest_file = sorted(menu_files)[-1]
-        menu_file_path = os.path.join(settings.MEDIA_ROOT, latest_file)
-        logger.info(f"Используем файл меню: {latest_file}")
-        
-        # Открываем существующий файл
-        wb = load_workbook(menu_file_path)
-        ws = wb.active
-        
-        # Маппинг дней недели к колонкам Excel (для блюд и для подсчета)
-        day_columns = {
-            0: ('B', 'C'),  # Понедельник (блюда в B, подсчет в C)
-            1: ('D', 'E'),  # Вторник (блюда в D, подсчет в E)
-            2: ('F', 'G'),  # Среда (блюда в F, подсчет в G)
-            3: ('H', 'I'),  # Четверг (блюда в H, подсчет в I)
-            4: ('J', 'K')   # Пятница (блюда в J, подсчет в K)
-        }
-        
-        # Для каждого дня недели
-        for day_offset in range(5):  # Пн-Пт
-            current_date = next_week_start + timedelta(days=day_offset)
-            meal_column, count_column = day_columns[day_offset]
-            
-            logger.info(f"\nОбработка дня: {current_date} (колонки {meal_column}/{count_column})")
-            
-            # Получаем меню на этот день
-            day_menu = menus.filter(date=current_date).first()
-            if not day_menu:
-                logger.info(f"Не найдено меню на {current_date}")
-                continue
-            
-            # Получаем все выборы на этот день
-            selections = UserSelection.objects.filter(day_menu=day_menu, not_eating=False)
-            logger.info(f"Найдено {selections.count()} выборов на {current_date}")
-            
-            # Инициализируем словарь для подсчета выборов
-            meal_counts = {}
-            
-            # Подсчитываем выборы для каждого блюда
-            for selection in selections:
-                # Проверяем каждый тип блюда
-                for meal_field in ['selected_salad', 'selected_soup', 'selected_main', 'selected_side', 'selected_bakery']:
-                    meal = getattr(selection, meal_field)
-                    if meal and meal.excel_row:
-                        if meal.excel_row not in meal_counts:
-                            meal_counts[meal.excel_row] = 0
-                        meal_counts[meal.excel_row] += 1
-                        logger.info(f"Подсчитан выбор для строки {meal.excel_row}: теперь {meal_counts[meal.excel_row]}")
-            
-            # Записываем результаты в Excel
-            for row, count in meal_counts.items():
-                cell = ws[f'{count_column}{row}']
-                cell.value = count
-                logger.info(f"Записано {count} выборов в ячейку {count_column}{row}")
-        
-        # Сохраняем изменения в тот же файл
-        wb.save(menu_file_path)
-        logger.info("Файл успешно сохранен")
-        
-        # Отправляем файл как ответ
-        with open(menu_file_path, 'rb') as f:
-            response = HttpResponse(
-                f.read(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = f'attachment; filename=menu_with_selections_{next_week_start.strftime("%Y%m%d")}.xlsx'
+        response = FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=export_filename(next_week_start),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
         
         return response
         
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('home')
     except Exception as e:
         logger.error(f"Ошибка при экспорте: {str(e)}", exc_info=True)
         logger.error(f"Traceback: {traceback.format_exc()}")
         messages.error(request, f"Произошла ошибка при экспорте данных: {str(e)}")
         return redirect('home')
 
-def parse_meal_name(cell_value):
-    """
-    Парсит название блюда из строки.
-    Возвращает название блюда и описание отдельно.
-    """
-    if not cell_value or not isinstance(cell_value, str):
-        return None, None
-        
-    # Нормализуем пробелы и переносы строк
-    cell_value = ' '.join(cell_value.split())
-    
-    # Ищем описание в скобках
-    import re
-    description_match = re.search(r'\s*\(([^)]+)\)\s*$', cell_value)
-    
-    if description_match:
-        # Получаем описание из скобок и удаляем лишние пробелы
-        description = description_match.group(1).strip()
-        # Получаем название блюда (все до скобок) и удаляем лишние пробелы
-        name = cell_value[:description_match.start()].strip()
-        
-        # Нормализуем название и описание
-        name = ' '.join(name.split())  # Удаляем множественные пробелы
-        description = ' '.join(description.split())  # Удаляем множественные пробелы
-        
-        return name, description
-    
-    # Если нет описания в скобках, возвращаем очищенное название без описания
-    return cell_value.strip(), None
-
 def parse_excel_smart(file_path, next_week_start):
     """
     Smart parser that handles meal descriptions and Excel coordinates
@@ -810,25 +944,20 @@ def parse_excel_smart(file_path, next_week_start):
                     name, description = parse_meal_name(str(cell.value))
                     if name:
                         try:
-                            # Всегда создаем новое блюдо
-                            meal = Meal.objects.create(
-                                name=name,
-                                category=category,
-                                description=description,
-                                excel_row=current_row
-                            )
-                            
-                            # Добавляем блюдо в соответствующую категорию меню
-                            if category_name == 'Салаты':
-                                day_menu.salads.add(meal)
-                            elif category_name == 'Супы':
-                                day_menu.soups.add(meal)
-                            elif category_name == 'Горячие блюда':
-                                day_menu.main_courses.add(meal)
-                            elif category_name == 'Гарниры':
-                                day_menu.sides.add(meal)
-                            elif category_name == 'Выпечка':
-                                day_menu.bakery.add(meal)
+                            # Точка сохранения: ошибка одного блюда не прерывает транзакцию загрузки
+                            with transaction.atomic():
+                                # Всегда создаем новое блюдо
+                                meal = Meal.objects.create(
+                                    name=name,
+                                    category=category,
+                                    description=description,
+                                    excel_row=current_row
+                                )
+                                
+                                # Добавляем блюдо в меню дня
+                                DayMenuItem.objects.create(
+                                    day_menu=day_menu, meal=meal, category=category, position=current_row
+                                )
                             
                             logger.info(f"Created new meal: {name} in {category_name} for {day_date} (row {current_row})")
                             
@@ -843,11 +972,13 @@ def is_admin_or_root(user):
 
 @user_passes_test(is_admin_or_root)
 def manage_dishes(request):
-    # Get only the "Горячие блюда" category
-    hot_dishes_category = FoodCategory.objects.get(name='Горячие блюда')
-    
     # Get dishes for hot dishes category
-    dishes = Meal.objects.filter(category=hot_dishes_category).order_by('name')
+    dishes = list(Meal.objects.filter(category__name=COMPLETE_DISH_CATEGORY).order_by('name'))
+
+    # Блюдам без запомненного решения подсказываем решение для похожего названия
+    index = load_dish_index()
+    for dish in dishes:
+        dish.suggestion = index.suggest(dish.name)
     
     return render(request, 'calendar_app/manage_dishes.html', {
         'dishes': dishes
@@ -855,34 +986,52 @@ def manage_dishes(request):
 
 @user_passes_test(is_admin_or_root)
 def update_complete_dish_status(request):
+    """
+    Отмечает горячие блюда полноценными или снимает отметку.
+    Принимает {"updates": [{"meal_id": 1, "is_complete": true}, ...]}
+    или одно изменение {"meal_id": 1, "is_complete": true}.
+    Все изменения применяются одним UPDATE на каждое состояние.
+    """
     if request.method != 'POST':
         return JsonResponse({'error': 'Метод не поддерживается'}, status=405)
     
     try:
         data = json.loads(request.body)
-        meal_id = data.get('meal_id')
-        is_complete = data.get('is_complete', False)
-        
-        meal = Meal.objects.get(id=meal_id)
-        
-        # Проверяем, что блюдо относится к категории "Горячие блюда"
-        if meal.category.name != 'Горячие блюда':
+        updates = data['updates'] if 'updates' in data else [data]
+
+        # Если одно блюдо пришло несколько раз, действует последнее изменение
+        states = {int(update['meal_id']): bool(update.get('is_complete', False)) for update in updates}
+        ids_by_state = {True: [], False: []}
+        for meal_id, is_complete in states.items():
+            ids_by_state[is_complete].append(meal_id)
+
+        # Проверка категории - часть того же UPDATE: блюда других категорий не меняются
+        hot_dishes = Meal.objects.filter(category__name=COMPLETE_DISH_CATEGORY)
+        updated = sum(
+            hot_dishes.filter(id__in=meal_ids).update(is_complete_dish=is_complete)
+            for is_complete, meal_ids in ids_by_state.items() if meal_ids
+        )
+        requested = len(states)
+
+        if requested and not updated:
             return JsonResponse({
-                'error': 'Только горячие блюда могут быть отмечены как полноценные'
-            }, status=400)
-        
-        meal.is_complete_dish = is_complete
-        meal.save()
+                'error': 'Блюда не найдены или не относятся к горячим блюдам'
+            }, status=404)
+        if updated:
+            # Запоминаем решения, чтобы новые блюда с такими названиями отмечались при импорте
+            remember_complete_flags(
+                hot_dishes.filter(id__in=list(states)).values_list('name', 'is_complete_dish')
+            )
+            bump_menu_version()
         
         return JsonResponse({
             'success': True,
-            'message': f'Статус блюда "{meal.name}" успешно обновлен',
-            'is_complete': meal.is_complete_dish
+            'message': f'Обновлено блюд: {updated}',
+            'updated': updated,
+            'skipped': requested - updated,
         })
         
-    except Meal.DoesNotExist:
-        return JsonResponse({'error': 'Блюдо не найдено'}, status=404)
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
         return JsonResponse({'error': 'Неверный формат данных'}, status=400)
     except Exception as e:
         logger.error(f'Error updating complete dish status: {str(e)}')
@@ -894,6 +1043,8 @@ def clear_all_dishes(request):
         try:
             # Delete all meals from the database
             Meal.objects.all().delete()
+            forget_last_import()
+            bump_menu_version()
             messages.success(request, 'Все блюда успешно удалены')
         except Exception as e:
             logger.error(f'Error clearing all dishes: {str(e)}')
@@ -72,6 +72,40 @@ TEMPLATES = [
     },
 ]
 
+# Cache for API payloads and reports, keyed by the menu version stamp
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'food-calendar',
+    },
+    # Separate cache so that cached reports never evict sessions. Local memory is per
+    # process, so cached sessions need a shared backend (Redis, memcached) under several workers
+    'sessions': {
+        'BACKEND': os.getenv('DJANGO_SESSION_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('DJANGO_SESSION_CACHE_LOCATION', 'food-calendar-sessions'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+if CACHES['sessions']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache':
+    CACHES['sessions'].pop('OPTIONS')
+
+# Session storage:
+#   db             - Django's default, a DB read on every request (default)
+#   signed_cookies - no server-side storage, the session lives in a signed cookie
+#   cached_db      - read from the sessions cache, write through to the DB
+#   cache          - cache only, sessions are lost on restart
+# cached_db and cache are opt-in: with several worker processes they need a shared
+# sessions cache (DJANGO_SESSION_CACHE_BACKEND/LOCATION), otherwise a logout in one
+# worker leaves the session valid in the others.
+SESSION_BACKEND = os.getenv('DJANGO_SESSION_BACKEND', 'db')
+SESSION_ENGINE = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'db': 'django.contrib.sessions.backends.db',
+}[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = 'sessions'
+
 WSGI_APPLICATION = 'radium_food.wsgi.application'
 
 
@@ -92,6 +126,36 @@ DATABASES = {
 AUTH_PASSWORD_VALIDATORS = [
 ]
 
+# Password hashing profile. The first hasher hashes new passwords, the rest only
+# verify existing hashes, which are re-hashed with the first one on login.
+#   default - Django's PBKDF2
+#   pbkdf2  - PBKDF2 with DJANGO_PASSWORD_HASHER_ITERATIONS iterations
+#   scrypt  - scrypt (needs OpenSSL with scrypt)
+#   argon2  - Argon2 (needs argon2-cffi)
+PASSWORD_HASHER_PROFILE = os.getenv('DJANGO_PASSWORD_HASHER_PROFILE', 'default')
+PASSWORD_HASHER_ITERATIONS = int(os.getenv('DJANGO_PASSWORD_HASHER_ITERATIONS', '0')) or None
+
+_VERIFY_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+_PREFERRED_HASHERS = {
+    'default': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'pbkdf2': 'calendar_app.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+}
+_preferred_hasher = _PREFERRED_HASHERS[PASSWORD_HASHER_PROFILE]
+PASSWORD_HASHERS = [_preferred_hasher] + [
+    hasher for hasher in _VERIFY_HASHERS
+    # Tuned PBKDF2 handles pbkdf2_sha256 hashes itself
+    if hasher != _preferred_hasher
+    and not (PASSWORD_HASHER_PROFILE == 'pbkdf2' and hasher.endswith('.PBKDF2PasswordHasher'))
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -137,6 +201,15 @@ FILE_UPLOAD_HANDLERS = [
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 FILE_UPLOAD_PERMISSIONS = 0o644
 FILE_UPLOAD_DIRECTORY_PERMISSIONS = 0o755
+# Largest menu workbook accepted for upload, bytes
+MENU_UPLOAD_MAX_SIZE = int(os.getenv('DJANGO_MENU_UPLOAD_MAX_SIZE', str(10 * 1024 * 1024)))
+
+# Number of worker processes for multi-site (sheet per site) menu imports, 0 = one per CPU
+MENU_IMPORT_WORKERS = int(os.getenv('DJANGO_MENU_IMPORT_WORKERS', '0')) or None
+
+# Selections for a week close on this weekday (0 = Monday) of the previous week at this local time
+SELECTION_DEADLINE_WEEKDAY = int(os.getenv('DJANGO_SELECTION_DEADLINE_WEEKDAY', '4'))
+SELECTION_DEADLINE_TIME = os.getenv('DJANGO_SELECTION_DEADLINE_TIME', '16:00')
 
 LOGGING = {
     'version': 1,